@@ -0,0 +1,168 @@
+from datetime import datetime
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import contains_eager
+from models import db, Album, ActivityEntry, Like, MediaItem, UserStats
+
+TIMELINE_LENGTH = 20
+
+COUNTERS = {
+    "album": UserStats.album_count,
+    "photo": UserStats.photo_count,
+    "video": UserStats.video_count,
+    "like": UserStats.like_count,
+}
+
+
+def _bump(user_ids, counter, delta):
+    """
+    Adds delta to a counter for each user that already has a stats row and
+    returns the ids that were updated. Users without a row (accounts from
+    before stats existed) are left alone until rebuild-stats builds it.
+    """
+    if not user_ids:
+        return []
+    column = COUNTERS[counter]
+    stmt = (
+        update(UserStats)
+        .where(UserStats.user_id.in_(user_ids))
+        .values({column: column + delta, UserStats.updated_at: datetime.utcnow()})
+        .returning(UserStats.user_id)
+    )
+    return db.session.scalars(stmt).all()
+
+
+def _trim(user_id, verb):
+    keep = (
+        select(ActivityEntry.id)
+        .where(ActivityEntry.user_id == user_id, ActivityEntry.verb == verb)
+        .order_by(ActivityEntry.created_at.desc(), ActivityEntry.id.desc())
+        .limit(TIMELINE_LENGTH)
+    )
+    db.session.execute(
+        delete(ActivityEntry)
+        .where(ActivityEntry.user_id == user_id, ActivityEntry.verb == verb, ActivityEntry.id.not_in(keep))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _add_entry(user_id, verb, media_id, created_at=None):
+    db.session.execute(insert(ActivityEntry).values(
+        user_id=user_id, verb=verb, media_id=media_id, created_at=created_at or datetime.utcnow(),
+    ))
+    _trim(user_id, verb)
+
+
+def user_registered(user):
+    """Call after the new user has been flushed, so it has an id."""
+    db.session.execute(insert(UserStats).values(user_id=user.id, updated_at=datetime.utcnow()))
+
+
+def album_created(album):
+    _bump([album.user_id], "album", 1)
+
+
+def album_deleted(album):
+    _bump([album.user_id], "album", -1)
+
+
+def media_uploaded(item):
+    """Call after the new item has been flushed, so it has an id."""
+    if _bump([item.user_id], item.kind, 1):
+        _add_entry(item.user_id, "upload", item.id, item.created_at)
+
+
+def media_imported(user_id, rows):
+    """Batch media_uploaded for rows inserted in bulk: dicts with id, kind and created_at."""
+    bumped = False
+    for kind in ("photo", "video"):
+        n = sum(1 for row in rows if row["kind"] == kind)
+        if n and _bump([user_id], kind, n):
+            bumped = True
+    if bumped:
+        newest = sorted(rows, key=lambda row: (row["created_at"], row["id"]))[-TIMELINE_LENGTH:]
+        db.session.execute(insert(ActivityEntry), [
+            {"user_id": user_id, "verb": "upload", "media_id": row["id"], "created_at": row["created_at"]}
+            for row in newest
+        ])
+        _trim(user_id, "upload")
+
+
+def media_deleted(item):
+    """Call before deleting the item; its likes and activity entries go with it."""
+    _bump([item.user_id], item.kind, -1)
+    likers = db.session.scalars(select(Like.user_id).where(Like.media_id == item.id)).all()
+    _bump(likers, "like", -1)
+
+
+def like_toggled(user_id, media_id, liked):
+    if not _bump([user_id], "like", 1 if liked else -1):
+        return
+    if liked:
+        _add_entry(user_id, "like", media_id)
+    else:
+        db.session.execute(delete(ActivityEntry).where(
+            ActivityEntry.user_id == user_id, ActivityEntry.verb == "like", ActivityEntry.media_id == media_id,
+        ))
+
+
+def _counts(user_id):
+    """A user's counters, counted from the source tables."""
+    kinds = dict(db.session.execute(
+        select(MediaItem.kind, func.count()).where(MediaItem.user_id == user_id).group_by(MediaItem.kind)
+    ).all())
+    return dict(
+        album_count=db.session.scalar(select(func.count()).select_from(Album).where(Album.user_id == user_id)),
+        photo_count=kinds.get("photo", 0),
+        video_count=kinds.get("video", 0),
+        like_count=db.session.scalar(select(func.count()).select_from(Like).where(Like.user_id == user_id)),
+    )
+
+
+def rebuild_stats(user_id):
+    """Recomputes a user's counters and timeline from the source tables."""
+    counts = _counts(user_id)
+    db.session.execute(delete(UserStats).where(UserStats.user_id == user_id))
+    db.session.execute(delete(ActivityEntry).where(ActivityEntry.user_id == user_id))
+    stats = db.session.scalars(insert(UserStats).returning(UserStats), [dict(
+        user_id=user_id, **counts, updated_at=datetime.utcnow(),
+    )]).one()
+    uploads = (
+        select(MediaItem.id, MediaItem.created_at).where(MediaItem.user_id == user_id)
+        .order_by(MediaItem.created_at.desc(), MediaItem.id.desc()).limit(TIMELINE_LENGTH)
+    )
+    likes = (
+        select(Like.media_id, Like.created_at).where(Like.user_id == user_id)
+        .order_by(Like.created_at.desc(), Like.id.desc()).limit(TIMELINE_LENGTH)
+    )
+    rows = [{"user_id": user_id, "verb": "upload", "media_id": m, "created_at": t}
+            for m, t in db.session.execute(uploads)]
+    rows += [{"user_id": user_id, "verb": "like", "media_id": m, "created_at": t}
+             for m, t in db.session.execute(likes)]
+    if rows:
+        db.session.execute(insert(ActivityEntry), rows)
+    return stats
+
+
+def get_stats(user_id):
+    """
+    The user's stats row. Reads never write: for a user without one the
+    counters are computed from the source tables into an unsaved row, and
+    rebuild-stats persists it.
+    """
+    stats = db.session.get(UserStats, user_id)
+    if stats is None:
+        stats = UserStats(user_id=user_id, **_counts(user_id))
+    return stats
+
+
+def timeline(user_id, verb, limit=10):
+    """Newest entries of one kind with their media items, in one query."""
+    entries = db.session.scalars(
+        select(ActivityEntry)
+        .join(ActivityEntry.media)
+        .options(contains_eager(ActivityEntry.media))
+        .where(ActivityEntry.user_id == user_id, ActivityEntry.verb == verb)
+        .order_by(ActivityEntry.created_at.desc(), ActivityEntry.id.desc())
+        .limit(limit)
+    ).all()
+    return [entry.media for entry in entries]
@@ -0,0 +1,5 @@
+"""ASGI entry point: uvicorn asgi:app. See asgi_app.GalleryASGI for what runs where."""
+from app import create_app
+from asgi_app import GalleryASGI
+
+app = GalleryASGI(create_app())
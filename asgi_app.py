@@ -0,0 +1,287 @@
+import asyncio
+import io
+import mimetypes
+import os
+import stat
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+from werkzeug.security import safe_join
+from werkzeug.wrappers import Response
+
+
+class GalleryASGI:
+    """
+    ASGI front for the Flask app. Nothing here blocks the event loop, so a
+    slow client costs a socket and a few buffers rather than a thread:
+
+    * files under /static/uploads and /static/thumbs are sent directly,
+      with the same ETag, conditional and Range handling as send_file;
+    * request bodies, including chunked uploads, are read as they arrive
+      and spooled (to a temp file past ASGI_SPOOL_BYTES) before the app
+      sees them;
+    * everything else runs in the Flask app on a pool of ASGI_APP_THREADS,
+      so database and Pillow work stays bounded, and its response body is
+      sent chunk by chunk, e.g. the album ZIP export. The body is iterated
+      in the same pool, since generators may run app code.
+
+    Direct file reads and upload spooling go to their own pool of
+    ASGI_FILE_THREADS. Each chunk is read only after the previous one has
+    been handed to the server, so a client that reads slowly slows the
+    reading down instead of filling memory.
+    """
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        config = flask_app.config
+        self.chunk_size = config["ASGI_CHUNK_SIZE"]
+        self.spool_bytes = config["ASGI_SPOOL_BYTES"]
+        self.max_body = config["MAX_CONTENT_LENGTH"]
+        self.app_pool = ThreadPoolExecutor(config["ASGI_APP_THREADS"], thread_name_prefix="asgi-app")
+        self.file_pool = ThreadPoolExecutor(config["ASGI_FILE_THREADS"], thread_name_prefix="asgi-file")
+        static = flask_app.static_url_path
+        self.media_roots = {
+            f"{static}/uploads/": config["UPLOAD_FOLDER"],
+            f"{static}/thumbs/": config["THUMB_FOLDER"],
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            raise ValueError(f"Unsupported ASGI scope type {scope['type']!r}")
+        if scope["method"] in ("GET", "HEAD"):
+            path = _app_path(scope)
+            for prefix, folder in self.media_roots.items():
+                if path.startswith(prefix):
+                    await self._send_file(scope, receive, send, safe_join(folder, path[len(prefix):]))
+                    return
+        await self._call_flask(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.app_pool.shutdown(wait=False, cancel_futures=True)
+                self.file_pool.shutdown(wait=False, cancel_futures=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _io(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.file_pool, fn, *args)
+
+    async def _send_file(self, scope, receive, send, path):
+        try:
+            f = await self._io(open, path, "rb") if path else None
+        except OSError:
+            f = None
+        if f is None or not stat.S_ISREG(os.fstat(f.fileno()).st_mode):
+            if f is not None:
+                await self._io(f.close)
+            await _plain(send, 404, b"Not Found")
+            return
+        try:
+            st = os.fstat(f.fileno())
+            response = Response(
+                mimetype=mimetypes.guess_type(path)[0] or "application/octet-stream",
+                direct_passthrough=True,
+            )
+            response.set_etag(f"{st.st_mtime_ns:x}-{st.st_size:x}")
+            response.last_modified = int(st.st_mtime)
+            max_age = self.flask_app.config["SEND_FILE_MAX_AGE_DEFAULT"]
+            if isinstance(max_age, timedelta):
+                max_age = int(max_age.total_seconds())
+            if max_age is None:
+                response.cache_control.no_cache = True
+            else:
+                response.cache_control.public = True
+                response.cache_control.max_age = max_age
+            response.content_length = st.st_size
+            environ = wsgi_environ(scope)
+            try:
+                response.make_conditional(environ, accept_ranges=True, complete_length=st.st_size)
+            except RequestedRangeNotSatisfiable:
+                await _plain(send, 416, b"Range Not Satisfiable", [("Content-Range", f"bytes */{st.st_size}")])
+                return
+
+            headers = response.get_wsgi_headers(environ)
+            # The server adds its own
+            headers.pop("Date", None)
+            if response.status_code == 412:
+                headers["Content-Length"] = "0"
+            await send({
+                "type": "http.response.start",
+                "status": response.status_code,
+                "headers": _encode_headers(headers.items()),
+            })
+            if response.status_code not in (200, 206) or scope["method"] == "HEAD":
+                await send({"type": "http.response.body"})
+                return
+
+            start, stop = 0, st.st_size
+            if response.status_code == 206:
+                start, stop = response.content_range.start, response.content_range.stop
+            disconnected = asyncio.ensure_future(_disconnect(receive))
+            try:
+                await self._io(f.seek, start)
+                remaining = stop - start
+                while remaining and not disconnected.done():
+                    chunk = await self._io(f.read, min(self.chunk_size, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": bool(remaining)})
+            finally:
+                disconnected.cancel()
+        finally:
+            await self._io(f.close)
+
+    async def _read_body(self, scope, receive, send):
+        """
+        The request body as a seeked-to-start file and its length, read as
+        the client sends it. Returns None if the client went away or the
+        body is over MAX_CONTENT_LENGTH (after answering 413) or its
+        Content-Length is not a number (after answering 400).
+        """
+        declared = dict(scope["headers"]).get(b"content-length")
+        if declared is not None and not declared.isdigit():
+            await _plain(send, 400, b"Bad Request")
+            return None
+        if self.max_body is not None and declared is not None and int(declared) > self.max_body:
+            await _plain(send, 413, b"Request Entity Too Large")
+            return None
+        body = tempfile.SpooledTemporaryFile(max_size=self.spool_bytes)
+        length = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                body.close()
+                return None
+            chunk = message.get("body", b"")
+            length += len(chunk)
+            if self.max_body is not None and length > self.max_body:
+                body.close()
+                await _plain(send, 413, b"Request Entity Too Large")
+                return None
+            if chunk:
+                await self._io(body.write, chunk)
+            if not message.get("more_body", False):
+                break
+        body.seek(0)
+        return body, length
+
+    async def _call_flask(self, scope, receive, send):
+        received = await self._read_body(scope, receive, send)
+        if received is None:
+            return
+        body, length = received
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started["status"] = int(status.split(" ", 1)[0])
+            started["headers"] = headers
+            return started.setdefault("written", []).append
+
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(
+                self.app_pool, self.flask_app, wsgi_environ(scope, body, length), start_response,
+            )
+        except BaseException:
+            body.close()
+            await _plain(send, 500, b"Internal Server Error")
+            raise
+
+        disconnected = asyncio.ensure_future(_disconnect(receive))
+        try:
+            await send({
+                "type": "http.response.start",
+                "status": started["status"],
+                "headers": _encode_headers(started["headers"]),
+            })
+            for chunk in started.get("written", []):
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            # Streamed bodies run app code (stream_with_context generators
+            # can query the database), so each chunk is pulled in the app
+            # pool and stays under the ASGI_APP_THREADS bound
+            chunks = iter(result)
+            while not disconnected.done():
+                chunk = await loop.run_in_executor(self.app_pool, next, chunks, None)
+                if chunk is None:
+                    break
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body"})
+        finally:
+            disconnected.cancel()
+            if hasattr(result, "close"):
+                await loop.run_in_executor(self.app_pool, result.close)
+            body.close()
+
+
+async def _disconnect(receive):
+    """Returns once the client has gone away, skipping any unread request body."""
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+def _app_path(scope):
+    path, root = scope["path"], scope.get("root_path", "")
+    return path[len(root):] if root and path.startswith(root) else path
+
+
+def wsgi_environ(scope, body=None, length=0):
+    """A WSGI environ for an ASGI HTTP scope whose body has already been read."""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode().decode("latin-1"),
+        "PATH_INFO": _app_path(scope).encode().decode("latin-1"),
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope['http_version']}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "CONTENT_LENGTH": str(length),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body if body is not None else io.BytesIO(),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+        "asgi.scope": scope,
+    }
+    for name, value in scope["headers"]:
+        name = name.decode("latin-1")
+        # The body has been de-chunked and measured
+        if name in ("content-length", "transfer-encoding"):
+            continue
+        key = "CONTENT_TYPE" if name == "content-type" else "HTTP_" + name.upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if key in environ:
+            # Repeated headers are folded into one; cookies use their own separator
+            value = f"{environ[key]}{'; ' if key == 'HTTP_COOKIE' else ','}{value}"
+        environ[key] = value
+    return environ
+
+
+def _encode_headers(headers):
+    return [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+
+
+async def _plain(send, status, text, headers=()):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": _encode_headers([
+            ("Content-Type", "text/plain; charset=utf-8"), ("Content-Length", str(len(text))), *headers,
+        ]),
+    })
+    await send({"type": "http.response.body", "body": text})
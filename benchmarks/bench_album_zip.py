@@ -0,0 +1,106 @@
+"""
+Album ZIP throughput: zipfile into a temp file vs zipstream.ZipStream.
+
+Each variant runs in its own subprocess so peak RSS is measured in
+isolation. The archive is drained in 64 KiB chunks, as a WSGI server
+would send it. Usage:
+
+    python benchmarks/bench_album_zip.py [--files 200 --size-mb 4 --runs 3]
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from datetime import datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+CHUNK = 64 * 1024
+
+
+def tempfile_zip(paths):
+    # Build the whole archive on disk, then send it
+    with tempfile.TemporaryFile() as tmp:
+        with zipfile.ZipFile(tmp, "w", zipfile.ZIP_STORED) as z:
+            for path in paths:
+                z.write(path, os.path.basename(path))
+        tmp.seek(0)
+        while chunk := tmp.read(CHUNK):
+            yield chunk
+
+
+def stream_zip(paths):
+    from zipstream import ZipEntry, ZipStream
+    now = datetime.now()
+    yield from ZipStream(ZipEntry(os.path.basename(p), p, os.path.getsize(p), now) for p in paths)
+
+
+VARIANTS = {"tempfile": tempfile_zip, "stream": stream_zip}
+
+
+def run_worker(variant, folder, runs):
+    paths = sorted(os.path.join(folder, name) for name in os.listdir(folder))
+    timings, first_bytes = [], []
+    total = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        first = None
+        total = 0
+        for chunk in VARIANTS[variant](paths):
+            if first is None:
+                first = time.perf_counter() - start
+            total += len(chunk)
+        timings.append(time.perf_counter() - start)
+        first_bytes.append(first)
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != "darwin":
+        rss *= 1024
+    print(json.dumps({
+        "variant": variant,
+        "median_s": statistics.median(timings),
+        "first_byte_ms": statistics.median(first_bytes) * 1000,
+        "mb_per_s": total / statistics.median(timings) / 1e6,
+        "peak_rss_mb": rss / (1024 * 1024),
+        "archive_bytes": total,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--size-mb", type=float, default=4)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--worker", choices=sorted(VARIANTS), help=argparse.SUPPRESS)
+    parser.add_argument("--folder", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.folder, args.runs)
+        return
+
+    with tempfile.TemporaryDirectory() as folder:
+        size = int(args.size_mb * 1024 * 1024)
+        for i in range(args.files):
+            with open(os.path.join(folder, f"photo_{i:05d}.jpg"), "wb") as f:
+                f.write(os.urandom(size))
+        print(f"{args.files} files x {args.size_mb:g} MB, {args.runs} runs")
+        for variant in ("tempfile", "stream"):
+            out = subprocess.run(
+                [sys.executable, __file__, "--worker", variant, "--folder", folder, "--runs", str(args.runs)],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            r = json.loads(out)
+            print(f"{variant:>8}: median {r['median_s']:6.2f} s   {r['mb_per_s']:7.1f} MB/s   "
+                  f"first byte {r['first_byte_ms']:8.1f} ms   peak RSS {r['peak_rss_mb']:6.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
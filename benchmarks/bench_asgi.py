@@ -0,0 +1,306 @@
+"""
+Thousands of slow clients against one server process: ASGI mode vs WSGI.
+
+Each client trickles 1 KiB per --interval seconds, as a phone on a poor
+link would. A third download a media file from /static/uploads, a third
+download the album ZIP and a third send a chunked photo upload. Meanwhile
+a probe fetches /login every 200 ms on a fresh connection. The "asgi"
+server is uvicorn running asgi_app.GalleryASGI; the "wsgi" server is a
+thread-pool WSGI server with as many threads as ASGI_APP_THREADS, which
+is how far sync workers go before requests queue. Usage:
+
+    python benchmarks/bench_asgi.py [--connections 2000 --duration 20 --modes asgi wsgi]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+MEDIA_MB = 2
+CHUNK = 1024
+PROBE_EVERY = 0.2
+PROBE_TIMEOUT = 5
+
+
+def make_app(folder):
+    from app import create_app
+    app = create_app()
+    # Served from the bench folder by both modes: by Flask's static route
+    # under WSGI and by GalleryASGI's media handler under ASGI
+    app.static_folder = folder
+    app.config.update(
+        UPLOAD_FOLDER=os.path.join(folder, "uploads"),
+        THUMB_FOLDER=os.path.join(folder, "thumbs"),
+        WTF_CSRF_ENABLED=False,
+    )
+    return app
+
+
+def seed(folder):
+    """One public album holding a MEDIA_MB video, owned by a single user."""
+    from werkzeug.security import generate_password_hash
+    from models import db, Album, User, Video
+    app = make_app(folder)
+    os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
+    with open(os.path.join(app.config["UPLOAD_FOLDER"], "bench.mp4"), "wb") as f:
+        f.write(os.urandom(MEDIA_MB * 1024 * 1024))
+    with app.app_context():
+        db.create_all()
+        user = User(full_name="Bench", email="bench@example.edu", password_hash=generate_password_hash("bench"),
+                    role="student")
+        db.session.add(user)
+        db.session.flush()
+        album = Album(title="Bench", visibility="public", user_id=user.id)
+        db.session.add(album)
+        db.session.flush()
+        db.session.add(Video(filename="bench.mp4", original_name="bench.mp4", album_id=album.id, user_id=user.id))
+        db.session.commit()
+        return album.id
+
+
+def serve(mode, folder, port):
+    app = make_app(folder)
+    if mode == "asgi":
+        import uvicorn
+        from asgi_app import GalleryASGI
+        uvicorn.run(GalleryASGI(app), host="127.0.0.1", port=port, log_level="error", backlog=8192,
+                    timeout_keep_alive=60)
+        return
+
+    from concurrent.futures import ThreadPoolExecutor
+    from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    class PooledWSGIServer(BaseWSGIServer):
+        # A fixed pool of sync workers, like gunicorn's gthread or uWSGI threads
+        request_queue_size = 8192
+
+        def __init__(self, *args, threads, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.pool = ThreadPoolExecutor(threads)
+
+        def process_request(self, request, client_address):
+            self.pool.submit(self._handle, request, client_address)
+
+        def _handle(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    PooledWSGIServer("127.0.0.1", port, app, QuietHandler, threads=app.config["ASGI_APP_THREADS"]).serve_forever()
+
+
+async def _connect(port):
+    sock = socket.socket()
+    # A small receive window makes the server feel the slow reader at once
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    sock.setblocking(False)
+    await asyncio.get_running_loop().sock_connect(sock, ("127.0.0.1", port))
+    return await asyncio.open_connection(sock=sock)
+
+
+async def slow_download(port, path, interval, stop, stats):
+    reader, writer = await _connect(port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: bench\r\n\r\n".encode())
+    await writer.drain()
+    stats["opened"] += 1
+    first = True
+    try:
+        while not stop.is_set():
+            data = await reader.read(CHUNK)
+            if not data:
+                break
+            if first:
+                stats["responding"] += 1
+                first = False
+            stats["bytes"] += len(data)
+            await asyncio.sleep(interval)
+    finally:
+        writer.close()
+
+
+async def login(port):
+    """A session cookie for the seeded user, so uploads get past login_required."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = b"email=bench%40example.edu&password=bench"
+    writer.write(b"POST /login HTTP/1.1\r\nHost: bench\r\nConnection: close\r\n"
+                 b"Content-Type: application/x-www-form-urlencoded\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body))
+    response = (await reader.read()).decode("latin-1")
+    writer.close()
+    for line in response.split("\r\n"):
+        if line.lower().startswith("set-cookie: session="):
+            return line.split(":", 1)[1].split(";")[0].strip()
+    raise RuntimeError("login failed")
+
+
+async def slow_upload(port, cookie, interval, stop, finish_by, stats):
+    reader, writer = await _connect(port)
+    boundary = "bench"
+    writer.write((
+        f"POST /photos/upload HTTP/1.1\r\nHost: bench\r\nCookie: {cookie}\r\nTransfer-Encoding: chunked\r\n"
+        f"Content-Type: multipart/form-data; boundary={boundary}\r\n\r\n"
+    ).encode())
+    head = (f'--{boundary}\r\nContent-Disposition: form-data; name="image"; filename="slow.jpg"\r\n'
+            "Content-Type: image/jpeg\r\n\r\n").encode()
+    writer.write(b"%x\r\n%s\r\n" % (len(head), head))
+    await writer.drain()
+    stats["opened"] += 1
+    try:
+        while not stop.is_set():
+            writer.write(b"%x\r\n%s\r\n" % (CHUNK, b"\0" * CHUNK))
+            await writer.drain()
+            stats["bytes"] += CHUNK
+            await asyncio.sleep(interval)
+        tail = f"\r\n--{boundary}--\r\n".encode()
+        writer.write(b"%x\r\n%s\r\n0\r\n\r\n" % (len(tail), tail))
+        await writer.drain()
+        status = await asyncio.wait_for(reader.readline(), max(finish_by - time.monotonic(), 0.1))
+        if status.startswith(b"HTTP/1.1 "):
+            stats["completed"] += 1
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def probe(port, stop, latencies):
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection("127.0.0.1", port), PROBE_TIMEOUT)
+            writer.write(b"GET /login HTTP/1.1\r\nHost: bench\r\nConnection: close\r\n\r\n")
+            await asyncio.wait_for(reader.read(), PROBE_TIMEOUT)
+            latencies.append(time.perf_counter() - start)
+            writer.close()
+        except (asyncio.TimeoutError, ConnectionError):
+            latencies.append(None)
+        await asyncio.sleep(PROBE_EVERY)
+
+
+def _proc_status(pid):
+    fields = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            fields[key] = value.split()[:1]
+    return int(fields["Threads"][0]), int(fields["VmRSS"][0]) / 1024
+
+
+async def load(port, pid, album_id, args):
+    stop, probe_stop = asyncio.Event(), asyncio.Event()
+    downloads = {"opened": 0, "responding": 0, "bytes": 0}
+    zips = {"opened": 0, "responding": 0, "bytes": 0}
+    uploads = {"opened": 0, "completed": 0, "bytes": 0}
+    latencies = []
+    finish_by = time.monotonic() + args.duration + args.drain
+    tasks = []
+    cookie = await login(port)
+    started = time.monotonic()
+    for i in range(args.connections):
+        kind = i % 3
+        if kind == 0:
+            coro = slow_download(port, "/static/uploads/bench.mp4", args.interval, stop, downloads)
+        elif kind == 1:
+            coro = slow_download(port, f"/album/{album_id}/download", args.interval, stop, zips)
+        else:
+            coro = slow_upload(port, cookie, args.interval, stop, finish_by, uploads)
+        tasks.append(asyncio.create_task(coro))
+        if i % 100 == 99:
+            await asyncio.sleep(0.05)
+    prober = asyncio.create_task(probe(port, probe_stop, latencies))
+    await asyncio.sleep(max(args.duration - (time.monotonic() - started), 1))
+    threads, rss = _proc_status(pid) if sys.platform == "linux" else (None, None)
+    probe_stop.set()
+    await prober
+    stop.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    ok = [t for t in latencies if t is not None]
+    return {
+        "downloads": downloads, "zips": zips, "uploads": uploads,
+        "errors": sum(isinstance(r, Exception) for r in results),
+        "probe_ok": len(ok), "probe_failed": len(latencies) - len(ok),
+        "probe_p50_ms": statistics.median(ok) * 1000 if ok else None,
+        "probe_p99_ms": statistics.quantiles(ok, n=100)[98] * 1000 if len(ok) > 1 else None,
+        "server_threads": threads, "server_rss_mb": rss,
+    }
+
+
+def _wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), 0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _ms(value):
+    return f"{value:8.1f}" if value is not None else "       -"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--connections", type=int, default=2000)
+    parser.add_argument("--duration", type=float, default=20, help="seconds the slow clients are held open")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between each client's 1 KiB")
+    parser.add_argument("--drain", type=float, default=10, help="seconds uploads get to finish afterwards")
+    parser.add_argument("--modes", nargs="+", choices=("asgi", "wsgi"), default=["asgi", "wsgi"])
+    parser.add_argument("--serve", choices=("asgi", "wsgi"), help=argparse.SUPPRESS)
+    parser.add_argument("--folder", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.folder, args.port)
+        return
+
+    with tempfile.TemporaryDirectory() as folder:
+        os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(folder, "bench.db")
+        album_id = seed(folder)
+        print(f"{args.connections} slow clients ({args.interval:g} s per KiB) held {args.duration:g} s, "
+              f"{MEDIA_MB} MB media file")
+        for mode in args.modes:
+            port = _free_port()
+            server = subprocess.Popen([sys.executable, __file__, "--serve", mode, "--folder", folder,
+                                       "--port", str(port)], env=os.environ)
+            try:
+                _wait_for_port(port)
+                r = asyncio.run(load(port, server.pid, album_id, args))
+            finally:
+                server.terminate()
+                server.wait()
+            print(json.dumps({"mode": mode, **r}) if os.environ.get("BENCH_JSON") else (
+                f"{mode}: media {r['downloads']['responding']:>5}/{r['downloads']['opened']:<5} streaming   "
+                f"zip {r['zips']['responding']:>5}/{r['zips']['opened']:<5} streaming   "
+                f"uploads {r['uploads']['completed']:>5}/{r['uploads']['opened']:<5} completed\n"
+                f"      /login under load: p50 {_ms(r['probe_p50_ms'])} ms  p99 {_ms(r['probe_p99_ms'])} ms  "
+                f"{r['probe_failed']} of {r['probe_ok'] + r['probe_failed']} timed out   "
+                f"server threads {r['server_threads']}  RSS {r['server_rss_mb']:.0f} MB"
+            ))
+
+
+if __name__ == "__main__":
+    main()
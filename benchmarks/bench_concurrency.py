@@ -0,0 +1,109 @@
+"""
+Concurrent write throughput on SQLite, with and without the engine tuning.
+
+Starts several worker processes, the way gunicorn would, that each toggle
+likes and post comments against a shared database file for a fixed time.
+Reports committed writes per second and the number of "database is locked"
+failures for the untuned settings (rollback journal, no pragmas) and the
+tuned settings from Config (WAL, busy_timeout, synchronous=NORMAL, ...).
+
+    python benchmarks/bench_concurrency.py --workers 8 --seconds 10
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def make_config(variant, db_path):
+    from config import Config
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = "sqlite:///" + db_path
+
+    if variant == "before":
+        BenchConfig.SQLALCHEMY_ENGINE_OPTIONS = {}
+        BenchConfig.SQLITE_PRAGMAS = {}
+    return BenchConfig
+
+
+def worker(variant, db_path, seconds, seed):
+    from sqlalchemy.exc import OperationalError
+    from app import create_app
+    from models import db, Like, Comment, Photo
+    app = create_app(make_config(variant, db_path))
+    rng = random.Random(seed)
+    writes = locked = reads = 0
+    with app.app_context():
+        user_ids = [1 + i for i in range(20)]
+        photo_ids = [row[0] for row in db.session.query(Photo.id).all()]
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            user_id, photo_id = rng.choice(user_ids), rng.choice(photo_ids)
+            try:
+                # Same statements as like_photo and comment_photo
+                existing = Like.query.filter_by(user_id=user_id, media_id=photo_id).first()
+                if existing:
+                    db.session.delete(existing)
+                else:
+                    db.session.add(Like(user_id=user_id, media_id=photo_id))
+                db.session.commit()
+                db.session.add(Comment(body="bench", user_id=user_id, media_id=photo_id))
+                db.session.commit()
+                writes += 2
+                Comment.query.filter_by(media_id=photo_id).order_by(Comment.created_at.desc()).limit(20).all()
+                reads += 1
+            except OperationalError as exc:
+                db.session.rollback()
+                if "locked" not in str(exc):
+                    raise
+                locked += 1
+    return writes, reads, locked
+
+
+def run(variant, db_path, workers, seconds):
+    with multiprocessing.Pool(workers) as pool:
+        totals = pool.starmap(worker, [(variant, db_path, seconds, i) for i in range(workers)])
+    # Workers run their loops concurrently for `seconds`; process start-up is excluded
+    elapsed = seconds
+    writes = sum(t[0] for t in totals)
+    reads = sum(t[1] for t in totals)
+    locked = sum(t[2] for t in totals)
+    print(f"{variant:>6}: {writes / elapsed:9.1f} writes/s  {reads / elapsed:9.1f} reads/s  "
+          f"{locked:6d} 'database is locked' errors")
+
+
+def prepare(db_path, variant):
+    from app import create_app
+    from models import db
+    from seed import seed_gallery
+    app = create_app(make_config(variant, db_path))
+    with app.app_context():
+        db.create_all()
+        seed_gallery({"users": 20, "albums": 10, "photos": 500, "videos": 0, "likes": 0, "comments": 0})
+        db.engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite concurrent write benchmark.")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    multiprocessing.set_start_method("spawn")
+    print(f"{args.workers} worker processes, {args.seconds:g}s each")
+    with tempfile.TemporaryDirectory() as tmp:
+        for variant in ("before", "after"):
+            db_path = os.path.join(tmp, f"{variant}.db")
+            prepare(db_path, variant)
+            run(variant, db_path, args.workers, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
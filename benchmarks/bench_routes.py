@@ -0,0 +1,342 @@
+"""
+Route benchmark and load test for the gallery.
+
+Seeds a database with synthetic content, then drives the main routes
+through the Flask test client (latency, SQL query count and Python memory
+per request) and through a concurrent HTTP load generator against a local
+threaded server (latency percentiles and throughput). Results are written
+as JSON and compared with a saved baseline.
+
+    python benchmarks/bench_routes.py --photos 20000 --out results.json
+    python benchmarks/bench_routes.py --save-baseline baseline.json
+    python benchmarks/bench_routes.py --baseline baseline.json --threshold 0.2
+
+Pass --db postgresql://... to run against Postgres instead of a throwaway
+SQLite file.
+"""
+import argparse
+import http.client
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+PASSWORD = "password"
+
+# Metrics compared against the baseline, and whether higher is worse
+REGRESSION_METRICS = {"p50_ms": True, "p95_ms": True, "queries": True, "peak_kb": True, "rps": False}
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+
+    def pct(p):
+        return samples[min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))]
+
+    return {
+        "count": len(samples),
+        "mean_ms": statistics.fmean(samples),
+        "p50_ms": pct(50),
+        "p90_ms": pct(90),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+        "max_ms": samples[-1],
+    }
+
+
+def sample_image():
+    from PIL import Image
+    buf = io.BytesIO()
+    Image.new("RGB", (1600, 1200), (90, 120, 200)).save(buf, "JPEG", quality=85)
+    return buf.getvalue()
+
+
+def build_app(args, tmp):
+    os.environ["DATABASE_URL"] = args.db or "sqlite:///" + os.path.join(tmp, "bench.db")
+    from app import create_app
+    app = create_app()
+    app.config.update(
+        TESTING=False,
+        WTF_CSRF_ENABLED=False,
+        UPLOAD_FOLDER=os.path.join(tmp, "uploads"),
+        THUMB_FOLDER=os.path.join(tmp, "thumbs"),
+    )
+    return app
+
+
+def seed(app, args):
+    from models import db, User
+    from seed import seed_gallery
+    with app.app_context():
+        db.create_all()
+        if args.reseed or not db.session.query(User.id).first():
+            start = time.perf_counter()
+            seed_gallery({
+                "users": args.users, "albums": args.albums, "photos": args.photos,
+                "videos": args.videos, "likes": args.likes, "comments": args.comments,
+                "tags": args.tags,
+            }, password=PASSWORD)
+            print(f"seeded in {time.perf_counter() - start:.1f}s")
+
+
+def pick_targets(app):
+    """Picks the rows each route is exercised with: the busiest album, the
+    most-liked photo and the user with the most uploads."""
+    from sqlalchemy import func
+    from models import db, User, Album, Photo, Like
+    with app.app_context():
+        admin = User.query.filter_by(role="admin").order_by(User.id).first()
+        uploader_id = (db.session.query(Photo.user_id).group_by(Photo.user_id)
+                       .order_by(func.count().desc()).limit(1).scalar()) or admin.id
+        album_id = (db.session.query(Photo.album_id).group_by(Photo.album_id)
+                    .order_by(func.count().desc()).limit(1).scalar())
+        photo_id = (db.session.query(Like.media_id).join(Photo, Photo.id == Like.media_id).group_by(Like.media_id)
+                    .order_by(func.count().desc()).limit(1).scalar()) or db.session.query(func.min(Photo.id)).scalar()
+        own_album = Album.query.filter_by(user_id=uploader_id).first()
+        users = {"admin": admin.email, "uploader": db.session.get(User, uploader_id).email}
+        return users, album_id, photo_id, own_album.id if own_album else album_id
+
+
+def build_routes(app, album_id, photo_id, upload_album_id):
+    """(name, user, method, path) for every benchmarked route."""
+    with app.test_request_context():
+        from flask import url_for
+        return [
+            ("index", "uploader", "GET", url_for("gallery.index")),
+            ("album_detail", "uploader", "GET", url_for("albums.album_detail", album_id=album_id)),
+            ("photo_detail", "uploader", "GET", url_for("media.photo_detail", photo_id=photo_id)),
+            ("favorites", "uploader", "GET", url_for("gallery.favorites")),
+            ("my_uploads", "uploader", "GET", url_for("gallery.my_uploads")),
+            ("photo_upload", "uploader", "POST", url_for("media.photo_upload")),
+            ("admin_dashboard", "admin", "GET", url_for("admin.admin_dashboard")),
+        ], upload_album_id
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+
+def bench_client(app, routes, users, upload_album_id, image, args):
+    from models import db
+    results = {}
+    clients = {}
+    for role, email in users.items():
+        client = app.test_client()
+        resp = client.post("/login", data={"email": email, "password": PASSWORD})
+        if resp.status_code != 302:
+            raise SystemExit(f"could not log in as {email}")
+        clients[role] = client
+
+    with app.app_context():
+        counter = QueryCounter(db.engine)
+
+    for name, role, method, path in routes:
+        client = clients[role]
+
+        def send():
+            if method == "POST":
+                data = {"album": str(upload_album_id), "caption": "bench", "tags": "bench, load",
+                        "image": (io.BytesIO(image), "bench.jpg")}
+                resp = client.post(path, data=data, content_type="multipart/form-data")
+            else:
+                resp = client.get(path)
+            if resp.status_code >= 400:
+                raise SystemExit(f"{name}: HTTP {resp.status_code}")
+
+        timings, queries = [], []
+        for i in range(args.warmup + args.requests):
+            counter.count = 0
+            start = time.perf_counter()
+            send()
+            elapsed = (time.perf_counter() - start) * 1000
+            if i >= args.warmup:
+                timings.append(elapsed)
+                queries.append(counter.count)
+
+        # Memory is traced on a separate request, tracemalloc skews timings
+        tracemalloc.start()
+        send()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        results[name] = {
+            **percentiles(timings),
+            "queries": statistics.median(queries),
+            "peak_kb": peak / 1024,
+        }
+        print(f"[client] {name:<16} p50 {results[name]['p50_ms']:8.2f} ms  p95 {results[name]['p95_ms']:8.2f} ms  "
+              f"queries {results[name]['queries']:6.0f}  peak {results[name]['peak_kb']:9.1f} KiB")
+    return results
+
+
+def multipart(fields, files):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for key, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{key}"\r\n\r\n{value}\r\n'.encode())
+    for key, (filename, content) in files.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{key}"; filename="{filename}"\r\n'
+                     f'Content-Type: application/octet-stream\r\n\r\n'.encode() + content + b"\r\n")
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def http_login(port, email):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    body = f"email={email}&password={PASSWORD}"
+    conn.request("POST", "/login", body, {"Content-Type": "application/x-www-form-urlencoded"})
+    resp = conn.getresponse()
+    resp.read()
+    cookie = resp.getheader("Set-Cookie", "").split(";", 1)[0]
+    conn.close()
+    if resp.status != 302 or not cookie:
+        raise SystemExit(f"could not log in as {email} over HTTP")
+    return cookie
+
+
+def bench_http(app, routes, users, upload_album_id, image, args):
+    from werkzeug.serving import make_server
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    port = server.server_port
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    cookies = {role: http_login(port, email) for role, email in users.items()}
+    upload_body, upload_type = multipart(
+        {"album": upload_album_id, "caption": "bench", "tags": "bench, load"},
+        {"image": ("bench.jpg", image)},
+    )
+    results = {}
+    local = threading.local()
+
+    try:
+        for name, role, method, path in routes:
+            def one(_):
+                conn = getattr(local, "conn", None)
+                if conn is None:
+                    conn = local.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+                headers = {"Cookie": cookies[role]}
+                body = None
+                if method == "POST":
+                    body = upload_body
+                    headers["Content-Type"] = upload_type
+                start = time.perf_counter()
+                conn.request(method, path, body, headers)
+                resp = conn.getresponse()
+                resp.read()
+                elapsed = (time.perf_counter() - start) * 1000
+                if resp.status >= 400:
+                    raise RuntimeError(f"{name}: HTTP {resp.status}")
+                if resp.getheader("Connection", "").lower() == "close" or resp.version == 10:
+                    conn.close()
+                    local.conn = None
+                return elapsed
+
+            with ThreadPoolExecutor(args.concurrency) as pool:
+                list(pool.map(one, range(args.warmup)))
+                start = time.perf_counter()
+                timings = list(pool.map(one, range(args.http_requests)))
+                wall = time.perf_counter() - start
+            local.__dict__.clear()
+            results[name] = {**percentiles(timings), "rps": len(timings) / wall}
+            print(f"[http]   {name:<16} p50 {results[name]['p50_ms']:8.2f} ms  p95 {results[name]['p95_ms']:8.2f} ms  "
+                  f"p99 {results[name]['p99_ms']:8.2f} ms  {results[name]['rps']:8.1f} req/s")
+    finally:
+        server.shutdown()
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Returns a list of human-readable regressions."""
+    regressions = []
+    for mode, routes in results["routes"].items():
+        for name, metrics in routes.items():
+            old = baseline.get("routes", {}).get(mode, {}).get(name)
+            if not old:
+                continue
+            for metric, higher_is_worse in REGRESSION_METRICS.items():
+                if metric not in metrics or not old.get(metric):
+                    continue
+                ratio = metrics[metric] / old[metric]
+                if (higher_is_worse and ratio > 1 + threshold) or (not higher_is_worse and ratio < 1 - threshold):
+                    regressions.append(f"{mode}/{name} {metric}: {old[metric]:.2f} -> {metrics[metric]:.2f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark and load-test the gallery routes.")
+    parser.add_argument("--db", help="database URL (default: temporary SQLite file)")
+    parser.add_argument("--reseed", action="store_true", help="seed even if the database has users")
+    for name, default in [("users", 200), ("albums", 300), ("photos", 5000), ("videos", 500),
+                          ("likes", 20000), ("comments", 10000), ("tags", 200)]:
+        parser.add_argument(f"--{name}", type=int, default=default)
+    parser.add_argument("--mode", choices=["client", "http", "both"], default="both")
+    parser.add_argument("--requests", type=int, default=20, help="test client requests per route")
+    parser.add_argument("--http-requests", type=int, default=200, help="HTTP requests per route")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--save-baseline", help="write results JSON as the new baseline")
+    parser.add_argument("--baseline", help="compare against this results JSON")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative slowdown")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = build_app(args, tmp)
+        seed(app, args)
+        users, album_id, photo_id, upload_album_id = pick_targets(app)
+        routes, upload_album_id = build_routes(app, album_id, photo_id, upload_album_id)
+        image = sample_image()
+
+        results = {
+            "meta": {
+                "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "database": app.config["SQLALCHEMY_DATABASE_URI"].split(":", 1)[0],
+                "counts": {k: getattr(args, k) for k in
+                           ("users", "albums", "photos", "videos", "likes", "comments", "tags")},
+                "concurrency": args.concurrency,
+            },
+            "routes": {},
+        }
+        if args.mode in ("client", "both"):
+            results["routes"]["client"] = bench_client(app, routes, users, upload_album_id, image, args)
+        if args.mode in ("http", "both"):
+            results["routes"]["http"] = bench_http(app, routes, users, upload_album_id, image, args)
+
+    for path in filter(None, (args.out, args.save_baseline)):
+        with open(path, "w") as fh:
+            json.dump(results, fh, indent=2)
+        print(f"wrote {path}")
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            regressions = compare(results, json.load(fh), args.threshold)
+        if regressions:
+            print("REGRESSIONS:")
+            for line in regressions:
+                print("  " + line)
+            sys.exit(1)
+        print("no regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
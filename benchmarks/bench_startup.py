@@ -0,0 +1,113 @@
+"""
+Worker and CLI startup: import time, create_app() and time to first request.
+
+Each run is a fresh interpreter, as an autoscaled worker would be. The
+"lazy" variant is the app as shipped; "eager" preloads Pillow and numpy
+first, which is what every worker paid before the media modules were
+imported on demand. The CLI row times `flask --app app gallery --help`.
+Usage:
+
+    python benchmarks/bench_startup.py [--runs 10] [--importtime]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+HEAVY = ("PIL", "numpy", "imaging", "importer")
+PRELOAD = {"lazy": [], "eager": ["PIL.Image", "numpy"]}
+
+
+def run_worker(variant):
+    start = time.perf_counter()
+    for name in PRELOAD[variant]:
+        __import__(name)
+    sys.path.insert(0, ROOT)
+    from app import create_app
+    imported = time.perf_counter()
+    app = create_app()
+    created = time.perf_counter()
+    response = app.test_client().get("/login")
+    assert response.status_code == 200, response.status_code
+    done = time.perf_counter()
+    print(json.dumps({
+        "import_ms": (imported - start) * 1000,
+        "create_ms": (created - imported) * 1000,
+        "first_request_ms": (done - created) * 1000,
+        "heavy": sorted(m for m in HEAVY if m in sys.modules),
+    }))
+
+
+def timed(cmd, env):
+    start = time.perf_counter()
+    out = subprocess.run(cmd, check=True, capture_output=True, text=True, cwd=ROOT, env=env).stdout
+    return (time.perf_counter() - start) * 1000, out
+
+
+def importtime_report(env, top=15):
+    """What `import app` spends its time on: -X importtime's direct children of app, by package."""
+    err = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        check=True, capture_output=True, text=True, cwd=ROOT, env=env,
+    ).stderr
+    packages = {}
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Nesting is two spaces per level after the separator's one
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 0:
+            # Children are listed before their parent; anything before app
+            # is interpreter startup
+            if name.strip() == "app":
+                break
+            packages.clear()
+        elif depth == 1:
+            package = name.strip().split(".")[0]
+            packages[package] = packages.get(package, 0) + int(cumulative)
+    print(f"\npython -X importtime -c 'import app', top {top} by cumulative ms")
+    for name, us in sorted(packages.items(), key=lambda kv: -kv[1])[:top]:
+        print(f"  {name:<24} {us / 1000:8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--importtime", action="store_true", help="also print the -X importtime breakdown")
+    parser.add_argument("--worker", choices=sorted(PRELOAD), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, "DATABASE_URL": "sqlite:///" + os.path.join(tmp, "bench.db")}
+        print(f"{args.runs} runs each, fresh interpreter per run (medians, ms)")
+        for variant in ("lazy", "eager"):
+            walls, results = [], []
+            for _ in range(args.runs):
+                wall, out = timed([sys.executable, __file__, "--worker", variant], env)
+                walls.append(wall)
+                results.append(json.loads(out))
+            median = {key: statistics.median(r[key] for r in results)
+                      for key in ("import_ms", "create_ms", "first_request_ms")}
+            print(f"{variant:>6}: import {median['import_ms']:7.1f}   create_app {median['create_ms']:6.1f}   "
+                  f"first request {median['first_request_ms']:6.1f}   process total {statistics.median(walls):7.1f}   "
+                  f"loaded {', '.join(results[-1]['heavy']) or '-'}")
+        cli = [timed([sys.executable, "-m", "flask", "--app", "app", "gallery", "--help"], env)[0]
+               for _ in range(args.runs)]
+        print(f"{'cli':>6}: flask --app app gallery --help   process total {statistics.median(cli):7.1f}")
+        if args.importtime:
+            importtime_report(env)
+
+
+if __name__ == "__main__":
+    main()
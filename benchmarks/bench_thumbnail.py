@@ -0,0 +1,113 @@
+"""
+Compares the legacy thumbnail code path with imaging.make_thumbnail.
+
+Each variant runs in its own subprocess so peak RSS is measured in
+isolation. Usage:
+
+    python benchmarks/bench_thumbnail.py [--width 6000 --height 4000 --runs 10]
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+THUMB_SIZE = (480, 480)
+
+
+def legacy_thumbnail(src, dest):
+    # Copy of the original utils.save_image thumbnail step
+    from PIL import Image
+    with Image.open(src) as im:
+        im.thumbnail(THUMB_SIZE)
+        im.save(dest)
+
+
+def fast_thumbnail(src, dest):
+    from imaging import make_thumbnail
+    make_thumbnail(src, dest, THUMB_SIZE)
+
+
+VARIANTS = {"legacy": legacy_thumbnail, "fast": fast_thumbnail}
+
+
+def make_sample(path, width, height, fmt):
+    from PIL import Image
+    im = Image.radial_gradient("L").resize((width, height)).convert("RGB")
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotated 90 degrees, as phone cameras write it
+    im.save(path, format=fmt, quality=92, exif=exif.tobytes())
+
+
+def run_worker(variant, src, runs):
+    fn = VARIANTS[variant]
+    ext = src.rsplit(".", 1)[1]
+    timings = []
+    with tempfile.TemporaryDirectory() as tmp:
+        dest = os.path.join(tmp, f"thumb.{ext}")
+        for _ in range(runs):
+            start = time.perf_counter()
+            fn(src, dest)
+            timings.append((time.perf_counter() - start) * 1000)
+        thumb_bytes = os.path.getsize(dest)
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != "darwin":
+        rss *= 1024
+    print(json.dumps({
+        "variant": variant,
+        "median_ms": statistics.median(timings),
+        "min_ms": min(timings),
+        "peak_rss_mb": rss / (1024 * 1024),
+        "thumb_bytes": thumb_bytes,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--width", type=int, default=6000)
+    parser.add_argument("--height", type=int, default=4000)
+    parser.add_argument("--format", default="JPEG", choices=["JPEG", "PNG", "WEBP"])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--worker", choices=sorted(VARIANTS), help=argparse.SUPPRESS)
+    parser.add_argument("--src", help=argparse.SUPPRESS)
+    parser.add_argument("--make-sample", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.make_sample:
+        make_sample(args.src, args.width, args.height, args.format)
+        return
+    if args.worker:
+        run_worker(args.worker, args.src, args.runs)
+        return
+
+    ext = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp"}[args.format]
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, f"sample.{ext}")
+        # Generated out of process: ru_maxrss survives fork, so a large
+        # allocation here would show up in every worker's peak.
+        subprocess.run(
+            [sys.executable, __file__, "--make-sample", "--src", src, "--format", args.format,
+             "--width", str(args.width), "--height", str(args.height)],
+            check=True,
+        )
+        print(f"{args.width}x{args.height} {args.format}, {os.path.getsize(src) / 1e6:.1f} MB, {args.runs} runs")
+        for variant in ("legacy", "fast"):
+            out = subprocess.run(
+                [sys.executable, __file__, "--worker", variant, "--src", src, "--runs", str(args.runs)],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            r = json.loads(out)
+            print(f"{variant:>7}: median {r['median_ms']:8.1f} ms   min {r['min_ms']:8.1f} ms   "
+                  f"peak RSS {r['peak_rss_mb']:7.1f} MB   thumb {r['thumb_bytes']} B")
+
+
+if __name__ == "__main__":
+    main()
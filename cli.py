@@ -0,0 +1,296 @@
+import time
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from models import db
+
+gallery_cli = AppGroup("gallery", help="Gallery maintenance commands.")
+
+
+@gallery_cli.command("seed")
+@click.option("--users", default=1000, show_default=True)
+@click.option("--albums", default=5000, show_default=True)
+@click.option("--photos", default=200000, show_default=True)
+@click.option("--videos", default=20000, show_default=True)
+@click.option("--likes", default=500000, show_default=True)
+@click.option("--comments", default=250000, show_default=True)
+@click.option("--tags", default=2000, show_default=True)
+@click.option("--password", default="password", show_default=True, help="Password for every seeded user.")
+@click.option("--seed", "rng_seed", default=0, show_default=True, help="Random seed.")
+@click.option("--batch-size", default=5000, show_default=True, help="Rows per INSERT statement.")
+@click.option("--images/--no-images", default=False, show_default=True,
+              help="Write placeholder image files for seeded photos.")
+@click.option("--workers", default=None, type=int, help="Processes for placeholder images.")
+def seed_command(users, albums, photos, videos, likes, comments, tags, password, rng_seed,
+                 batch_size, images, workers):
+    """Bulk-insert a large synthetic gallery."""
+    from seed import seed_gallery, write_placeholder_images
+
+    db.create_all()
+    start = time.perf_counter()
+    inserted = seed_gallery(
+        {"users": users, "albums": albums, "photos": photos, "videos": videos,
+         "likes": likes, "comments": comments, "tags": tags},
+        password=password, seed=rng_seed, batch_size=batch_size,
+    )
+    elapsed = time.perf_counter() - start
+    files = inserted.pop("photo_files", [])
+    total = sum(inserted.values())
+    for table, n in inserted.items():
+        click.echo(f"  {table:<14} {n:>10,}")
+    click.echo(f"Inserted {total:,} rows in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} rows/s)")
+
+    # Seeded rows bypass the like/comment hooks, so score them in one pass
+    from trending import refresh_scores
+    start = time.perf_counter()
+    scored = refresh_scores(batch_size)
+    db.session.commit()
+    click.echo(f"Scored {scored:,} items for trending in {time.perf_counter() - start:.1f}s")
+
+    if images and files:
+        start = time.perf_counter()
+        written = write_placeholder_images(
+            files, current_app.config["UPLOAD_FOLDER"], current_app.config["THUMB_FOLDER"], workers=workers,
+        )
+        click.echo(f"Wrote {written:,} placeholder images in {time.perf_counter() - start:.1f}s")
+
+
+# Copies from the pre-media_item schema, in dependency order. Videos are
+# renumbered past the highest photo id; :offset is that shift.
+MEDIA_COPIES = [
+    ("media_item", "photo",
+     "INSERT INTO media_item (id, kind, filename, original_name, caption, album_id, user_id, created_at) "
+     "SELECT id, 'photo', filename, original_name, caption, album_id, user_id, created_at FROM photo"),
+    ("media_item", "video",
+     "INSERT INTO media_item (id, kind, filename, original_name, caption, album_id, user_id, created_at) "
+     "SELECT id + :offset, 'video', filename, original_name, caption, album_id, user_id, created_at FROM video"),
+    ("media_tags", "photo_tags",
+     "INSERT INTO media_tags (media_id, tag_id) SELECT photo_id, tag_id FROM photo_tags"),
+    ("like", "legacy_like",
+     'INSERT INTO "like" (user_id, media_id, created_at) SELECT user_id, photo_id, created_at FROM legacy_like'),
+    ("like", "video_like",
+     'INSERT INTO "like" (user_id, media_id, created_at) SELECT user_id, video_id + :offset, created_at FROM video_like'),
+    ("comment", "legacy_comment",
+     "INSERT INTO comment (body, user_id, media_id, created_at) "
+     "SELECT body, user_id, COALESCE(photo_id, video_id + :offset), created_at FROM legacy_comment "
+     "WHERE photo_id IS NOT NULL OR video_id IS NOT NULL"),
+    ("comment", "video_comment",
+     "INSERT INTO comment (body, user_id, media_id, created_at) "
+     "SELECT body, user_id, video_id + :offset, created_at FROM video_comment"),
+]
+LEGACY_TABLES = ("photo_tags", "video_like", "video_comment", "legacy_like", "legacy_comment", "video", "photo")
+
+
+@gallery_cli.command("migrate-media")
+@click.option("--drop-legacy", is_flag=True, help="Drop the old per-type tables after copying.")
+def migrate_media_command(drop_legacy):
+    """Copy photos and videos with their likes, comments and tags into media_item."""
+    from sqlalchemy import func, inspect, select, text
+    from models import MediaItem
+
+    engine = db.engine
+    quote = engine.dialect.identifier_preparer.quote
+    tables = set(inspect(engine).get_table_names())
+    if "photo" not in tables and "video" not in tables:
+        db.create_all()
+        click.echo("No photo/video tables found; nothing to migrate.")
+        return
+
+    with engine.begin() as conn:
+        # like and comment keep their names, so move the old ones out of the way
+        for name in ("like", "comment"):
+            if name in tables and "media_id" not in {c["name"] for c in inspect(conn).get_columns(name)}:
+                conn.execute(text(f"ALTER TABLE {quote(name)} RENAME TO legacy_{name}"))
+                if name == "like" and engine.dialect.name == "postgresql":
+                    conn.execute(text("ALTER TABLE legacy_like RENAME CONSTRAINT uniq_like TO legacy_uniq_like"))
+                tables.add(f"legacy_{name}")
+        db.metadata.create_all(conn)
+
+        if conn.scalar(select(func.count()).select_from(MediaItem.__table__)):
+            click.echo("media_item already has rows; skipping the copy.")
+        else:
+            offset = conn.scalar(text("SELECT MAX(id) FROM photo")) if "photo" in tables else 0
+            for target, source, sql in MEDIA_COPIES:
+                if source in tables:
+                    n = conn.execute(text(sql), {"offset": offset or 0}).rowcount
+                    click.echo(f"  {source:<14} -> {target:<10} {n:>10,}")
+            if engine.dialect.name == "postgresql":
+                conn.execute(text(
+                    "SELECT setval(pg_get_serial_sequence('media_item', 'id'), "
+                    "COALESCE((SELECT MAX(id) FROM media_item), 1))"
+                ))
+            if offset:
+                click.echo(f"Video ids were shifted by {offset} to follow photo ids.")
+
+        if drop_legacy:
+            cascade = " CASCADE" if engine.dialect.name == "postgresql" else ""
+            for name in LEGACY_TABLES:
+                if name in tables:
+                    conn.execute(text(f"DROP TABLE {quote(name)}{cascade}"))
+            click.echo("Dropped legacy tables.")
+
+
+@gallery_cli.command("upgrade-db")
+def upgrade_db_command():
+    """Add the tables, columns and indexes that newer releases expect to an existing database."""
+    from sqlalchemy import inspect
+    from database import upgrade_schema
+
+    tables = set(inspect(db.engine).get_table_names())
+    if "media_item" not in tables and tables & {"photo", "video"}:
+        raise click.ClickException("This database predates media_item; run `gallery migrate-media` first.")
+    with db.engine.begin() as conn:
+        columns, indexes = upgrade_schema(conn, db.metadata)
+    for column in columns:
+        click.echo(f"  added column {column}")
+    for index in indexes:
+        click.echo(f"  added index  {index}")
+    click.echo(f"Schema is up to date ({len(columns)} columns and {len(indexes)} indexes added).")
+
+
+@gallery_cli.command("rebuild-stats")
+@click.option("--batch-size", default=500, show_default=True, help="Users per transaction.")
+def rebuild_stats_command(batch_size):
+    """Recompute every user's profile counters and activity timeline."""
+    from activity import rebuild_stats
+    from models import User
+
+    user_ids = db.session.scalars(db.select(User.id).order_by(User.id)).all()
+    for start in range(0, len(user_ids), batch_size):
+        for user_id in user_ids[start:start + batch_size]:
+            rebuild_stats(user_id)
+        db.session.commit()
+    click.echo(f"Rebuilt stats for {len(user_ids):,} users.")
+
+
+@gallery_cli.command("rollup-stats")
+@click.option("--days", default=30, show_default=True, help="Days of hourly/daily buckets to recompute.")
+def rollup_stats_command(days):
+    """Recompute admin dashboard rollups and totals from the source tables."""
+    from datetime import datetime, timedelta
+    import rollups
+
+    start = time.perf_counter()
+    buckets = rollups.rebuild_rollups(datetime.utcnow() - timedelta(days=days))
+    rollups.prune(current_app.config["STATS_HOURLY_RETENTION_DAYS"])
+    totals = rollups.rebuild_totals()
+    db.session.commit()
+    click.echo(f"Rebuilt {buckets:,} buckets and totals ({totals.users:,} users, "
+               f"{totals.photos + totals.videos:,} media) in {time.perf_counter() - start:.1f}s")
+
+
+@gallery_cli.command("refresh-trending")
+def refresh_trending_command():
+    """Recompute every photo and video's trending score from its likes and comments."""
+    import trending
+
+    start = time.perf_counter()
+    n = trending.refresh_scores()
+    db.session.commit()
+    click.echo(f"Scored {n:,} items in {time.perf_counter() - start:.1f}s")
+
+
+@gallery_cli.command("hash-photos")
+@click.option("--workers", default=None, type=int, help="Processes for reading thumbnails.")
+def hash_photos_command(workers):
+    """Compute dHashes for photos that do not have one yet, then rebuild the duplicate report."""
+    import similar
+
+    start = time.perf_counter()
+    hashed, todo = similar.hash_missing(workers=workers)
+    db.session.commit()
+    click.echo(f"Hashed {hashed:,} of {todo:,} photos in {time.perf_counter() - start:.1f}s")
+    _find_duplicates()
+
+
+def _find_duplicates():
+    import similar
+
+    start = time.perf_counter()
+    groups = similar.store_duplicate_groups()
+    db.session.commit()
+    click.echo(f"Found {groups:,} groups of near-duplicate photos in {time.perf_counter() - start:.1f}s")
+
+
+@gallery_cli.command("find-duplicates")
+def find_duplicates_command():
+    """Rebuild the admin near-duplicate report from the stored dHashes."""
+    _find_duplicates()
+
+
+@gallery_cli.command("backfill-exif")
+@click.option("--batch-size", default=500, show_default=True, help="Photos read and committed per batch.")
+def backfill_exif_command(batch_size):
+    """Read capture time, camera, lens, size and GPS for photos uploaded before EXIF parsing."""
+    import exif
+
+    start = time.perf_counter()
+    done = 0
+    for done, last_id in exif.backfill(batch_size):
+        click.echo(f"  {done:>10,} photos (up to id {last_id})")
+    click.echo(f"Read EXIF for {done:,} photos in {time.perf_counter() - start:.1f}s")
+
+
+@gallery_cli.command("import")
+@click.argument("path", type=click.Path(exists=True))
+@click.option("--album", "album_ref", required=True, help="Album id, or the title of an album to use or create.")
+@click.option("--owner", help="Email of the owner if a new album is created (default: the first admin).")
+@click.option("--tags", default="", help="Comma-separated tags added to every item.")
+@click.option("--folder-tags/--no-folder-tags", default=True, show_default=True,
+              help="Also tag items with the names of the folders they are in.")
+@click.option("--workers", default=None, type=int, help="Processes for hashing, copying and thumbnailing.")
+@click.option("--batch-size", default=200, show_default=True, help="Files per transaction.")
+def import_command(path, album_ref, owner, tags, folder_tags, workers, batch_size):
+    """Import photos and videos from a server-side directory or ZIP file into an album."""
+    import activity
+    import importer
+    import rollups
+    from models import Album, User
+    from utils import parse_tags
+
+    album = db.session.get(Album, int(album_ref)) if album_ref.isdigit() else Album.query.filter_by(title=album_ref).first()
+    if album is None and album_ref.isdigit():
+        raise click.BadParameter(f"no album with id {album_ref}", param_hint="--album")
+    if album is None:
+        user = User.query.filter_by(email=owner.lower()).first() if owner else \
+            User.query.filter_by(role="admin").order_by(User.id).first()
+        if user is None:
+            raise click.BadParameter("no such user" if owner else "no admin user to own the album", param_hint="--owner")
+        album = Album(title=album_ref, user_id=user.id)
+        db.session.add(album)
+        db.session.flush()
+        activity.album_created(album)
+        rollups.album_created(album)
+        click.echo(f"Created album {album.id} ({album.title!r}) owned by {user.email}.")
+    db.session.commit()
+
+    start = time.perf_counter()
+
+    def report(counts):
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        click.echo(f"  {counts['seen']:>8,} seen  {counts['imported']:>8,} imported  {counts['skipped']:>6,} skipped  "
+                   f"{counts['failed']:>4,} failed  {counts['imported'] / elapsed:7.1f} files/s  "
+                   f"{counts['bytes'] / elapsed / 1e6:7.1f} MB/s")
+
+    counts = importer.import_media(
+        path, album, tags=[t[:importer.TAG_LENGTH] for t in parse_tags(tags)], folder_tags=folder_tags,
+        workers=workers, batch_size=batch_size, progress=report,
+    )
+    for error in counts["errors"]:
+        click.echo(f"  failed: {error}", err=True)
+    click.echo(f"Imported {counts['imported']:,} of {counts['seen']:,} files into album {album.id} "
+               f"({counts['skipped']:,} already imported, {counts['failed']:,} failed) "
+               f"in {time.perf_counter() - start:.1f}s")
+
+
+@gallery_cli.command("measure-storage")
+@click.option("--batch-size", default=1000, show_default=True, help="Items measured and committed per batch.")
+def measure_storage_command(batch_size):
+    """Record bytes on disk for photos and videos uploaded before sizes were stored."""
+    import users
+
+    start = time.perf_counter()
+    done = 0
+    for done in users.measure_storage(batch_size):
+        pass
+    click.echo(f"Measured {done:,} items in {time.perf_counter() - start:.1f}s")
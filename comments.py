@@ -0,0 +1,60 @@
+import base64
+from datetime import datetime
+from flask import url_for
+from flask_login import current_user
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import selectinload
+from models import db, Comment
+
+PAGE_SIZE = 20
+
+
+def encode_cursor(comment):
+    raw = f"{comment.created_at.isoformat()}|{comment.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Returns (created_at, id) for a cursor; raises ValueError if malformed."""
+    padded = cursor + "=" * (-len(cursor) % 4)
+    # binascii.Error and UnicodeDecodeError are both ValueErrors
+    created_at, comment_id = base64.urlsafe_b64decode(padded).decode().split("|")
+    return datetime.fromisoformat(created_at), int(comment_id)
+
+
+def comment_page(media_id, cursor=None, limit=PAGE_SIZE):
+    """
+    One page of comments on a photo/video, newest first, keyed on
+    (created_at, id) so each page is an index range scan regardless of how
+    deep it is. Authors are loaded in one extra IN query for the page.
+    Returns (comments, next_cursor); next_cursor is None on the last page.
+    """
+    stmt = (
+        select(Comment)
+        .options(selectinload(Comment.user))
+        .where(Comment.media_id == media_id)
+        .order_by(Comment.created_at.desc(), Comment.id.desc())
+        .limit(limit + 1)
+    )
+    if cursor:
+        stmt = stmt.where(tuple_(Comment.created_at, Comment.id) < decode_cursor(cursor))
+    comments = db.session.scalars(stmt).all()
+    next_cursor = encode_cursor(comments[limit - 1]) if len(comments) > limit else None
+    return comments[:limit], next_cursor
+
+
+def comment_count(media_id):
+    return db.session.scalar(select(func.count()).select_from(Comment).where(Comment.media_id == media_id))
+
+
+def serialize_comment(comment):
+    can_delete = current_user.is_authenticated and (
+        current_user.id == comment.user_id or current_user.is_admin()
+    )
+    return {
+        "id": comment.id,
+        "body": comment.body,
+        "author": comment.user.full_name,
+        "created_at": comment.created_at.strftime("%b %d, %H:%M"),
+        "delete_url": url_for("media.delete_comment", comment_id=comment.id) if can_delete else None,
+    }
@@ -1,17 +1,67 @@
-import os
-
-BASE_DIR = os.path.abspath(os.path.dirname(__file__))
-
-class Config:
-    SECRET_KEY = os.environ.get("SECRET_KEY", "change-this-in-production")
-    SQLALCHEMY_DATABASE_URI = os.environ.get(
-        "DATABASE_URL",
-        "sqlite:///" + os.path.join(BASE_DIR, "gallery.db")
-    )
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
-
-    UPLOAD_FOLDER = os.path.join(BASE_DIR, "static", "uploads")
-    THUMB_FOLDER = os.path.join(BASE_DIR, "static", "thumbs")
-    MAX_CONTENT_LENGTH = 10 * 1024 * 1024  # 10 MB
-    ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "webp", "mp4", "mov", "avi", "mkv", "webm"}
-    THUMB_SIZE = (480, 480)
+import os
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+
+
+def engine_options(uri):
+    """SQLALCHEMY_ENGINE_OPTIONS for the given database URL."""
+    if uri.startswith("sqlite"):
+        # SQLite locking is tuned with SQLITE_PRAGMAS instead
+        return {}
+    return {
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", 10)),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", 20)),
+        "pool_timeout": 30,
+        "pool_pre_ping": True,  # drop connections the server closed
+        "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", 1800)),
+    }
+
+
+class Config:
+    SECRET_KEY = os.environ.get("SECRET_KEY", "change-this-in-production")
+    SQLALCHEMY_DATABASE_URI = os.environ.get(
+        "DATABASE_URL",
+        "sqlite:///" + os.path.join(BASE_DIR, "gallery.db")
+    )
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+
+    # Comma-separated read replica URLs. GET requests read from a replica
+    # unless the same session wrote within READ_YOUR_WRITES_SECONDS.
+    SQLALCHEMY_REPLICA_URIS = [u for u in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if u]
+    READ_YOUR_WRITES_SECONDS = 10
+
+    # Applied to every new SQLite connection. WAL lets readers run alongside
+    # the single writer, and busy_timeout makes writers wait for the lock
+    # instead of failing with "database is locked".
+    SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",
+        "busy_timeout": 10000,           # ms
+        "synchronous": "NORMAL",         # fsync at checkpoints only, safe with WAL
+        "mmap_size": 256 * 1024 * 1024,  # bytes
+        "cache_size": -64000,            # negative means KiB, so 64 MB
+    }
+
+    UPLOAD_FOLDER = os.path.join(BASE_DIR, "static", "uploads")
+    THUMB_FOLDER = os.path.join(BASE_DIR, "static", "thumbs")
+    MAX_CONTENT_LENGTH = 10 * 1024 * 1024  # 10 MB
+    ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "webp", "mp4", "mov", "avi", "mkv", "webm"}
+    THUMB_SIZE = (480, 480)
+    MAX_IMAGE_PIXELS = 50_000_000  # reject decompression bombs before decoding
+    TRENDING_HALF_LIFE_HOURS = 24  # run `gallery refresh-trending` after changing
+    SIMILAR_PHOTO_MAX_DISTANCE = 6  # dHash bits; 0-3 is a near-identical copy
+    STATS_HOURLY_RETENTION_DAYS = 14  # older hourly rollups are pruned by `gallery rollup-stats`
+    # Logged-in users are identified from a per-process cache (and, if enabled,
+    # a signed snapshot in the session cookie) instead of a query per request.
+    # Role and name changes reach other processes within the TTL.
+    USER_CACHE_SIZE = 10_000
+    USER_CACHE_TTL_SECONDS = 60
+    USER_SESSION_SNAPSHOT = os.environ.get("USER_SESSION_SNAPSHOT", "0") == "1"
+    # ASGI mode (uvicorn asgi:app). Requests run in the Flask app on a pool
+    # of ASGI_APP_THREADS, which bounds concurrent database and Pillow work;
+    # keep it at or below the database pool size. File reads and writes for
+    # media, request bodies and streamed responses use ASGI_FILE_THREADS.
+    ASGI_APP_THREADS = int(os.environ.get("ASGI_APP_THREADS", 16))
+    ASGI_FILE_THREADS = int(os.environ.get("ASGI_FILE_THREADS", 8))
+    ASGI_CHUNK_SIZE = 64 * 1024
+    ASGI_SPOOL_BYTES = 1024 * 1024  # request bodies past this are spooled to a temp file
@@ -0,0 +1,113 @@
+import random
+import time
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, inspect, text
+from sqlalchemy.schema import CreateColumn
+
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def apply_sqlite_pragmas(engine, pragmas):
+    """Runs the given PRAGMAs on every new connection made by a SQLite engine."""
+    if engine.dialect.name != "sqlite" or not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def register_sqlite_functions(engine, functions):
+    """Adds Python SQL functions ({name: (num_args, fn)}) to every new SQLite connection."""
+    if engine.dialect.name != "sqlite" or not functions:
+        return
+
+    @event.listens_for(engine, "connect")
+    def create_functions(dbapi_connection, connection_record):
+        for name, (num_args, fn) in functions.items():
+            dbapi_connection.create_function(name, num_args, fn, deterministic=True)
+
+
+def replica_binds(uris, engine_options):
+    """SQLALCHEMY_BINDS entries ("replica_0", "replica_1", ...) for replica URLs."""
+    return {f"replica_{i}": {"url": uri, **engine_options(uri)} for i, uri in enumerate(uris)}
+
+
+class RoutingSession(Session):
+    """
+    Sends SELECTs to a read replica when the current request allows it (see
+    init_read_routing). Flushes, DML and everything outside a request use
+    the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and clause is not None and clause.is_select:
+            key = g.get("db_replica") if has_request_context() else None
+            if key is not None:
+                return self._db.engines[key]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def init_read_routing(app):
+    """
+    Routes read-only requests to one of the replica binds.
+
+    Any request that is not GET/HEAD/OPTIONS uses the primary, and so does
+    every request from the same browser session for READ_YOUR_WRITES_SECONDS
+    after a successful write, so the redirect after a POST sees the new row.
+    """
+    replicas = sorted(k for k in app.config.get("SQLALCHEMY_BINDS", {}) if k.startswith("replica_"))
+    if not replicas:
+        return
+
+    @app.before_request
+    def choose_replica():
+        if request.method in READ_METHODS and session.get("_primary_until", 0) < time.time():
+            # One replica per request so every query sees the same snapshot
+            g.db_replica = random.choice(replicas)
+
+    @app.after_request
+    def pin_to_primary(response):
+        if request.method not in READ_METHODS and response.status_code < 400:
+            session["_primary_until"] = time.time() + current_app.config["READ_YOUR_WRITES_SECONDS"]
+        return response
+
+
+def _index_names(conn, inspector, table_name):
+    """Names of the indexes on a table. SQLite reflection skips expression indexes, so ask sqlite_master."""
+    if conn.dialect.name == "sqlite":
+        return set(conn.scalars(
+            text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :t"), {"t": table_name}
+        ))
+    return {i["name"] for i in inspector.get_indexes(table_name)}
+
+
+def upgrade_schema(conn, metadata):
+    """
+    Brings a database created by an older release up to metadata: creates
+    missing tables, adds missing columns with ALTER TABLE ... ADD COLUMN and
+    creates missing indexes. Existing rows are left alone, so backfilling the
+    new columns is up to the data commands. Returns (columns, indexes) added,
+    as "table.name" and index names.
+    """
+    metadata.create_all(conn)
+    inspector = inspect(conn)
+    quote = conn.dialect.identifier_preparer.quote
+    columns, indexes = [], []
+    for table in metadata.tables.values():
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                ddl = CreateColumn(column).compile(dialect=conn.dialect)
+                conn.execute(text(f"ALTER TABLE {quote(table.name)} ADD COLUMN {ddl}"))
+                columns.append(f"{table.name}.{column.name}")
+        existing = _index_names(conn, inspector, table.name)
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(conn)
+                indexes.append(index.name)
+    return columns, indexes
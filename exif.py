@@ -0,0 +1,112 @@
+import os
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import bindparam, select, update
+from models import db, Album, MediaItem, Photo
+from sharing import album_visible
+
+EXIF_COLUMNS = ("taken_at", "camera", "lens", "width", "height", "gps_lat", "gps_lon")
+
+# ?sort= values. The taken_at sorts only list photos with a capture time and
+# walk the (…, taken_at, id) indexes in order.
+SORTS = {
+    "uploaded": (MediaItem.created_at.desc(), MediaItem.id.desc()),
+    "taken": (Photo.taken_at.desc(), MediaItem.id.desc()),
+    "taken_asc": (Photo.taken_at.asc(), MediaItem.id.asc()),
+}
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_filters(args):
+    """Filter and sort options from a request's query string; invalid values are dropped."""
+    sort = args.get("sort", "uploaded")
+    return {
+        "sort": sort if sort in SORTS else "uploaded",
+        "taken_from": _parse_date(args.get("taken_from")),
+        "taken_to": _parse_date(args.get("taken_to")),
+        "camera": args.get("camera", "").strip() or None,
+    }
+
+
+def filter_args(filters):
+    """The non-default options as query string values, for pagination links."""
+    args = {}
+    if filters["sort"] != "uploaded":
+        args["sort"] = filters["sort"]
+    for name in ("taken_from", "taken_to"):
+        if filters[name]:
+            args[name] = filters[name].strftime("%Y-%m-%d")
+    if filters["camera"]:
+        args["camera"] = filters["camera"]
+    return args
+
+
+def apply_filters(query, filters):
+    """Adds the taken_at range, camera and sort order to a MediaItem query."""
+    if filters["sort"] != "uploaded" or filters["taken_from"] or filters["taken_to"]:
+        query = query.filter(Photo.taken_at.is_not(None))
+    if filters["taken_from"]:
+        query = query.filter(Photo.taken_at >= filters["taken_from"])
+    if filters["taken_to"]:
+        # Inclusive of the whole end day
+        query = query.filter(Photo.taken_at < filters["taken_to"] + timedelta(days=1))
+    if filters["camera"]:
+        query = query.filter(Photo.camera == filters["camera"])
+    return query.order_by(*SORTS[filters["sort"]])
+
+
+def cameras(viewer, album_id=None, limit=100):
+    """Distinct camera names on photos the viewer can see, for the filter dropdown."""
+    stmt = select(Photo.camera).where(Photo.camera.is_not(None)).distinct().order_by(Photo.camera).limit(limit)
+    if album_id is not None:
+        # The album page has already checked can_view()
+        stmt = stmt.where(Photo.album_id == album_id)
+    else:
+        stmt = stmt.join(Album, Photo.album_id == Album.id).where(album_visible(viewer))
+    return db.session.scalars(stmt).all()
+
+
+def backfill(batch_size=500):
+    """
+    Reads EXIF for every photo that has not been read yet, batch_size rows
+    at a time. Each batch is fetched by keyset on id, updated with one
+    executemany and committed, so memory stays flat and an interrupted run
+    picks up where it stopped. Unreadable files get width 0 so they are not
+    retried. Yields (done, last_id) after each batch.
+    """
+    from PIL import Image
+    from imaging import read_metadata
+
+    upload_folder = current_app.config["UPLOAD_FOLDER"]
+    table = MediaItem.__table__
+    stmt = update(table).where(table.c.id == bindparam("_id")).values(
+        {name: bindparam(f"_{name}") for name in EXIF_COLUMNS}
+    )
+    done, last_id = 0, 0
+    while True:
+        batch = db.session.execute(
+            select(Photo.id, Photo.filename)
+            .where(Photo.width.is_(None), Photo.id > last_id)
+            .order_by(Photo.id)
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            return
+        rows = []
+        for photo_id, filename in batch:
+            try:
+                metadata = read_metadata(os.path.join(upload_folder, filename))
+            except (OSError, ValueError, Image.DecompressionBombError):
+                metadata = dict.fromkeys(EXIF_COLUMNS) | {"width": 0}
+            rows.append({"_id": photo_id, **{f"_{k}": v for k, v in metadata.items()}})
+        db.session.connection().execute(stmt, rows)
+        db.session.commit()
+        done += len(rows)
+        last_id = batch[-1][0]
+        yield done, last_id
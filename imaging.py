@@ -0,0 +1,191 @@
+import os
+from contextlib import contextmanager
+from datetime import datetime
+import numpy as np
+from PIL import Image
+
+# Encoder settings per output format. Thumbnails are small, so the extra JPEG
+# and GIF optimisation passes are cheap; quality is tuned for on-screen previews.
+SAVE_OPTIONS = {
+    "JPEG": {"quality": 82, "optimize": True, "progressive": True},
+    "PNG": {"compress_level": 6},
+    "WEBP": {"quality": 80, "method": 4},
+    "GIF": {"optimize": True},
+}
+
+# EXIF orientation tag -> transpose needed to display the image upright
+ORIENTATION_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+EXIF_ORIENTATION = 0x0112
+
+# Keys from Image.info that are safe to carry over to the thumbnail.
+# Everything else (EXIF, XMP, comments, text chunks) is dropped.
+KEEP_INFO = ("icc_profile", "transparency")
+
+
+class ImageTooLarge(ValueError):
+    """Raised when an image exceeds the configured pixel budget."""
+
+
+@contextmanager
+def _open(path):
+    """
+    Image.open, with Pillow's own decompression bomb check (twice
+    Image.MAX_IMAGE_PIXELS, raised before our budget can be checked)
+    reported as ImageTooLarge.
+    """
+    try:
+        im = Image.open(path)
+    except Image.DecompressionBombError as e:
+        raise ImageTooLarge(str(e)) from e
+    with im:
+        yield im
+
+
+def make_thumbnail(src_path: str, dest_path: str, size, max_pixels: int = None,
+                   reducing_gap: float = 2.0):
+    """
+    Writes an upright, metadata-free thumbnail of src_path to dest_path.
+
+    Only the header is read before the pixel budget is checked, and JPEGs are
+    decoded in draft mode at a reduced scale, so the full-resolution bitmap is
+    never held in memory. Animated images are thumbnailed from their first
+    frame only. Returns the (width, height) of the source image.
+    """
+    with _open(src_path) as im:
+        width, height = im.size
+        if max_pixels and width * height > max_pixels:
+            raise ImageTooLarge(f"{width}x{height} exceeds {max_pixels} pixels")
+
+        fmt = im.format
+        orientation = im.getexif().get(EXIF_ORIENTATION, 1)
+        transpose = ORIENTATION_TRANSPOSE.get(orientation)
+
+        # Orientations 5-8 swap the axes, so fit the box before rotating.
+        box = tuple(size)
+        if transpose in (Image.Transpose.TRANSPOSE, Image.Transpose.ROTATE_270,
+                         Image.Transpose.TRANSVERSE, Image.Transpose.ROTATE_90):
+            box = (box[1], box[0])
+
+        if getattr(im, "n_frames", 1) > 1:
+            im.seek(0)
+
+        # thumbnail() calls draft() itself, letting the JPEG decoder scale by
+        # 1/2, 1/4 or 1/8 before resampling the remainder.
+        im.thumbnail(box, reducing_gap=reducing_gap)
+        thumb = im.transpose(transpose) if transpose is not None else im.copy()
+
+    thumb.info = {k: v for k, v in thumb.info.items() if k in KEEP_INFO}
+    if fmt == "JPEG" and thumb.mode not in ("RGB", "L"):
+        thumb = thumb.convert("RGB")
+
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    thumb.save(dest_path, format=fmt, **SAVE_OPTIONS.get(fmt, {}))
+    return width, height
+
+
+# dHash compares each pixel of a (HASH_SIZE + 1) x HASH_SIZE greyscale
+# reduction with its right-hand neighbour, giving HASH_SIZE ** 2 bits.
+HASH_SIZE = 8
+
+
+def dhash_pixels(path: str):
+    """The greyscale reduction dHash works on, as a (HASH_SIZE, HASH_SIZE + 1) uint8 array."""
+    with _open(path) as im:
+        im.draft("L", (HASH_SIZE * 8, HASH_SIZE * 8))
+        small = im.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.LANCZOS)
+    return np.asarray(small, dtype=np.uint8)
+
+
+def dhash_batch(pixels):
+    """
+    dHash of a stack of reductions, shape (N, HASH_SIZE, HASH_SIZE + 1),
+    computed with array operations across the whole batch. Returns a uint64
+    array; bit 63 is the top-left comparison.
+    """
+    bits = pixels[:, :, 1:] > pixels[:, :, :-1]
+    packed = np.packbits(bits.reshape(len(pixels), -1), axis=1)
+    return packed.view(">u8").ravel().astype(np.uint64)
+
+
+def dhash(path: str) -> int:
+    return int(dhash_batch(dhash_pixels(path)[np.newaxis])[0])
+
+
+# EXIF tags read into indexed photo columns (see exif.py)
+EXIF_DATETIME = 0x0132
+EXIF_MAKE = 0x010F
+EXIF_MODEL = 0x0110
+EXIF_DATETIME_ORIGINAL = 0x9003
+EXIF_LENS_MODEL = 0xA434
+EXIF_IFD = 0x8769
+GPS_IFD = 0x8825
+EXIF_DATE_FORMAT = "%Y:%m:%d %H:%M:%S"
+
+
+def _exif_text(value):
+    if isinstance(value, bytes):
+        value = value.decode("ascii", "ignore")
+    value = str(value or "").replace("\x00", "").strip()
+    return value or None
+
+
+def _exif_degrees(dms, ref):
+    try:
+        degrees = float(dms[0]) + float(dms[1]) / 60 + float(dms[2]) / 3600
+    except (TypeError, ValueError, IndexError, ZeroDivisionError):
+        return None
+    return -degrees if _exif_text(ref) in ("S", "W") else degrees
+
+
+def read_metadata(path: str) -> dict:
+    """
+    Capture time, camera, lens, upright dimensions and GPS position of an
+    image, from its header only. Missing or malformed tags come back as None.
+    """
+    with _open(path) as im:
+        width, height = im.size
+        exif = im.getexif()
+    ifd = exif.get_ifd(EXIF_IFD)
+    gps = exif.get_ifd(GPS_IFD)
+
+    if exif.get(EXIF_ORIENTATION) in (5, 6, 7, 8):
+        width, height = height, width
+
+    taken_at = None
+    raw = _exif_text(ifd.get(EXIF_DATETIME_ORIGINAL) or exif.get(EXIF_DATETIME))
+    if raw:
+        try:
+            taken_at = datetime.strptime(raw[:19], EXIF_DATE_FORMAT)
+        except ValueError:
+            pass
+
+    make, model = _exif_text(exif.get(EXIF_MAKE)), _exif_text(exif.get(EXIF_MODEL))
+    # Most models already start with the make ("Canon EOS R6")
+    if make and model and model.lower().startswith(make.split()[0].lower()):
+        make = None
+    camera = " ".join(p for p in (make, model) if p) or None
+
+    lat = lon = None
+    if gps.get(2) and gps.get(4):
+        lat, lon = _exif_degrees(gps[2], gps.get(1)), _exif_degrees(gps[4], gps.get(3))
+        if lat is None or lon is None or not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            lat = lon = None
+
+    return {
+        "taken_at": taken_at,
+        "camera": camera and camera[:120],
+        "lens": (_exif_text(ifd.get(EXIF_LENS_MODEL)) or "")[:120] or None,
+        "width": width,
+        "height": height,
+        "gps_lat": lat,
+        "gps_lon": lon,
+    }
@@ -0,0 +1,206 @@
+import hashlib
+import os
+import secrets
+import shutil
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+from flask import current_app
+from PIL import Image
+from sqlalchemy import insert, select
+from werkzeug.utils import secure_filename
+import activity
+import rollups
+import trending
+from imaging import dhash, make_thumbnail, read_metadata
+from models import db, MediaItem, Tag, media_tags
+from similar import hash_values
+from utils import parse_tags
+
+IMAGE_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "webp"}
+COPY_BUFFER = 1024 * 1024
+TAG_LENGTH = 60
+
+# ZipFile handles kept open per worker process, so each member read does
+# not re-parse the archive's central directory
+_archives = {}
+
+
+def _allowed(name, extensions):
+    return "." in name and not name.startswith(".") and name.rsplit(".", 1)[1].lower() in extensions
+
+
+def iter_sources(path, extensions):
+    """
+    Yields (source, member, name, folder) for each importable file under a
+    directory or in a ZIP archive, in a stable order, without listing the
+    whole tree first. member is the archive entry name, or None for plain
+    files; folder is the file's directory relative to path.
+    """
+    if not os.path.isdir(path):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                folder, _, name = info.filename.rpartition("/")
+                if not info.is_dir() and not folder.startswith("__MACOSX") and _allowed(name, extensions):
+                    yield path, info.filename, name, folder
+        return
+    for root, dirs, files in os.walk(path):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        folder = os.path.relpath(root, path)
+        for name in sorted(files):
+            if _allowed(name, extensions):
+                yield os.path.join(root, name), None, name, "" if folder == "." else folder
+
+
+@contextmanager
+def _open(source, member):
+    if member is None:
+        with open(source, "rb") as f:
+            yield f
+        return
+    if source not in _archives:
+        _archives[source] = zipfile.ZipFile(source)
+    with _archives[source].open(member) as f:
+        yield f
+
+
+def _digest(job):
+    """Worker: (sha256 hex digest, size) of one source file."""
+    source, member = job
+    with _open(source, member) as f:
+        digest = hashlib.file_digest(f, "sha256").hexdigest()
+        return digest, f.tell()
+
+
+def _ingest(job):
+    """
+    Worker: copies one source into the upload folder and, for images, writes
+    its thumbnail and reads its dHash and EXIF. Returns the media_item column
+    values, or {"error": message} after removing anything it wrote.
+    """
+    source, member, name, settings = job
+    ext = name.rsplit(".", 1)[1].lower()
+    rand = secrets.token_hex(8)
+    filename = f"{rand}.{ext}"
+    path = os.path.join(settings["upload_folder"], filename)
+    thumb_path = os.path.join(settings["thumb_folder"], f"{rand}_thumb.{ext}")
+    row = {"filename": filename, "original_name": secure_filename(name) or filename}
+    try:
+        with _open(source, member) as src, open(path, "wb") as dst:
+            shutil.copyfileobj(src, dst, COPY_BUFFER)
+        if ext not in IMAGE_EXTENSIONS:
+            return {**row, "kind": "video", "size_bytes": os.path.getsize(path)}
+        make_thumbnail(path, thumb_path, settings["thumb_size"], max_pixels=settings["max_pixels"])
+        return {
+            **row, "kind": "photo", "size_bytes": os.path.getsize(path) + os.path.getsize(thumb_path),
+            **hash_values(dhash(thumb_path)), **read_metadata(path),
+        }
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        # ImageTooLarge is a ValueError; some formats only trip Pillow's own
+        # bomb check while decoding
+        for p in (path, thumb_path):
+            if os.path.exists(p):
+                os.remove(p)
+        return {"error": f"{member or source}: {e}"}
+
+
+def _folder_tags(folder):
+    return [name[:TAG_LENGTH] for name in parse_tags(folder.replace("/", ","))]
+
+
+def _tag_ids(names, cache):
+    """Ids for tag names, creating missing tags; cache persists across batches."""
+    missing = sorted(set(names) - cache.keys())
+    if missing:
+        cache.update(db.session.execute(select(Tag.name, Tag.id).where(Tag.name.in_(missing))).all())
+        new = [{"name": name} for name in missing if name not in cache]
+        if new:
+            db.session.execute(insert(Tag), new)
+            cache.update(db.session.execute(
+                select(Tag.name, Tag.id).where(Tag.name.in_([t["name"] for t in new]))
+            ).all())
+    return [cache[name] for name in names]
+
+
+def _insert(album, rows, tag_cache):
+    """Inserts one batch of ingested rows with their tags and runs the bulk hooks."""
+    now = datetime.utcnow()
+    score = trending.event_score(now, "upload")
+    columns = set().union(*rows) - {"tags"}
+    values = [
+        {**dict.fromkeys(columns), **{k: v for k, v in row.items() if k != "tags"},
+         "album_id": album.id, "user_id": album.user_id, "created_at": now, "trending_score": score}
+        for row in rows
+    ]
+    table = MediaItem.__table__
+    ids = db.session.scalars(insert(table).returning(table.c.id, sort_by_parameter_order=True), values).all()
+    links = [
+        {"media_id": media_id, "tag_id": tag_id}
+        for media_id, row in zip(ids, rows)
+        for tag_id in _tag_ids(row["tags"], tag_cache)
+    ]
+    if links:
+        db.session.execute(insert(media_tags), links)
+    for media_id, row in zip(ids, values):
+        row["id"] = media_id
+    activity.media_imported(album.user_id, values)
+    rollups.media_imported(album.user_id, values)
+
+
+def import_media(path, album, tags=(), folder_tags=True, workers=None, batch_size=200, progress=None):
+    """
+    Imports every photo and video under a directory or in a ZIP into album.
+
+    Sources are read batch_size at a time. A worker pool hashes each batch,
+    files whose SHA-256 is already in media_item (or earlier in the batch)
+    are skipped, and the rest are copied, thumbnailed and inserted in one
+    transaction per batch, so an interrupted import can simply be rerun.
+    progress, if given, is called with the running counts after each batch.
+    """
+    config = current_app.config
+    settings = {
+        "upload_folder": config["UPLOAD_FOLDER"],
+        "thumb_folder": config["THUMB_FOLDER"],
+        "thumb_size": config["THUMB_SIZE"],
+        "max_pixels": config["MAX_IMAGE_PIXELS"],
+    }
+    os.makedirs(settings["upload_folder"], exist_ok=True)
+    os.makedirs(settings["thumb_folder"], exist_ok=True)
+
+    counts = {"seen": 0, "imported": 0, "skipped": 0, "failed": 0, "bytes": 0, "errors": []}
+    tag_cache = {}
+    sources = iter_sources(path, config["ALLOWED_EXTENSIONS"])
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while batch := list(islice(sources, batch_size)):
+            counts["seen"] += len(batch)
+            digests = list(pool.map(_digest, [(source, member) for source, member, _, _ in batch]))
+            known = set(db.session.scalars(
+                select(MediaItem.content_hash).where(MediaItem.content_hash.in_({d for d, _ in digests}))
+            ))
+            todo = []
+            for (source, member, name, folder), (digest, size) in zip(batch, digests):
+                if digest in known:
+                    counts["skipped"] += 1
+                    continue
+                known.add(digest)
+                todo.append((source, member, name, folder, digest, size))
+
+            rows = []
+            jobs = [(source, member, name, settings) for source, member, name, _, _, _ in todo]
+            for (_, _, _, folder, digest, size), result in zip(todo, pool.map(_ingest, jobs)):
+                if "error" in result:
+                    counts["failed"] += 1
+                    counts["errors"].append(result["error"])
+                    continue
+                names = list(tags) + (_folder_tags(folder) if folder_tags else [])
+                rows.append({**result, "content_hash": digest, "tags": list(dict.fromkeys(names))})
+                counts["bytes"] += size
+            if rows:
+                _insert(album, rows, tag_cache)
+            db.session.commit()
+            counts["imported"] += len(rows)
+            if progress:
+                progress(counts)
+    return counts
@@ -0,0 +1,69 @@
+from datetime import datetime
+from sqlalchemy import delete, func, insert, literal, select
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db, Like, MediaItem
+from activity import like_toggled
+import rollups
+import trending
+
+
+def _insert_ignoring_duplicates():
+    """INSERT into like that skips rows hitting the uniq_like constraint."""
+    dialect = db.session.get_bind(mapper=Like).dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(Like)
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(Like)
+    else:
+        return insert(Like).prefix_with("IGNORE")
+    return stmt.on_conflict_do_nothing(index_elements=["user_id", "media_id"])
+
+
+def like_count(media_id):
+    return db.session.scalar(select(func.count()).select_from(Like).where(Like.media_id == media_id))
+
+
+def toggle_like(media_model, user_id, media_id):
+    """
+    Likes or unlikes a photo/video for a user without loading any rows.
+
+    A DELETE ... RETURNING removes an existing like; if there was none, an
+    INSERT ... SELECT ... ON CONFLICT DO NOTHING adds it, selecting from
+    media_item so an id that is missing or of the wrong kind inserts nothing.
+    Returns (liked, count), or None if the media item does not exist.
+    """
+    kind = media_model.__mapper__.polymorphic_identity
+    removed = db.session.execute(
+        delete(Like)
+        .where(
+            Like.user_id == user_id,
+            Like.media_id == media_id,
+            Like.media_id.in_(select(MediaItem.id).where(MediaItem.id == media_id, MediaItem.kind == kind)),
+        )
+        .returning(Like.created_at)
+    ).first()
+
+    if removed:
+        liked, liked_at, changed = False, removed.created_at, True
+    else:
+        liked_at = datetime.utcnow()
+        result = db.session.execute(
+            _insert_ignoring_duplicates().from_select(
+                ["user_id", "media_id", "created_at"],
+                select(literal(user_id), MediaItem.id, literal(liked_at))
+                .where(MediaItem.id == media_id, MediaItem.kind == kind),
+            )
+        )
+        if result.rowcount == 0 and db.session.get(media_model, media_id) is None:
+            db.session.rollback()
+            return None
+        # rowcount 0 here means a concurrent request inserted the same like
+        liked, changed = True, result.rowcount == 1
+
+    if changed:
+        like_toggled(user_id, media_id, liked)
+        rollups.like_toggled(user_id, media_id, liked)
+        trending.like_toggled(media_id, liked, liked_at)
+    count = like_count(media_id)
+    db.session.commit()
+    return liked, count
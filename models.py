@@ -1,176 +1,306 @@
-from datetime import datetime
-from flask_sqlalchemy import SQLAlchemy
-from flask_login import UserMixin
-
-db = SQLAlchemy()
-
-# Association table for Photo <-> Tag many-to-many
-photo_tags = db.Table(
-    "photo_tags",
-    db.Column("photo_id", db.Integer, db.ForeignKey("photo.id", ondelete="CASCADE"), primary_key=True),
-    db.Column("tag_id", db.Integer, db.ForeignKey("tag.id", ondelete="CASCADE"), primary_key=True),
-)
-
-
-class User(UserMixin, db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    full_name = db.Column(db.String(120), nullable=False)
-    email = db.Column(db.String(255), unique=True, nullable=False, index=True)
-    password_hash = db.Column(db.String(255), nullable=False)
-    role = db.Column(db.String(20), default="student")  # student | editor | admin
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-
-    # Relationships
-    albums = db.relationship("Album", backref="owner", lazy=True)
-    photos = db.relationship("Photo", backref="uploader", lazy=True)
-    videos = db.relationship("Video", backref="uploader", lazy=True)
-
-    # Role helpers
-    def is_faculty(self):
-        return self.role == "editor"
-
-    def is_admin(self):
-        return self.role == "admin"
-
-    def is_editor(self):
-        return self.role in ("editor", "admin")
-
-    def __repr__(self):
-        return f"<User {self.full_name}>"
-
-
-class Album(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    title = db.Column(db.String(140), nullable=False)
-    description = db.Column(db.Text)
-    visibility = db.Column(db.String(20), default="public")  # public | private
-    cover_photo_id = db.Column(db.Integer, db.ForeignKey("photo.id"), nullable=True)
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-
-    def __repr__(self):
-        return f"<Album {self.title}>"
-
-
-class Photo(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    filename = db.Column(db.String(255), nullable=False)       # saved name
-    original_name = db.Column(db.String(255), nullable=False)  # user upload name
-    caption = db.Column(db.String(255))
-    album_id = db.Column(db.Integer, db.ForeignKey("album.id"), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-
-    # Tags many-to-many
-    tags = db.relationship(
-        "Tag",
-        secondary=photo_tags,
-        backref=db.backref("photos", lazy="dynamic"),
-    )
-
-    def thumb_name(self):
-        base, ext = self.filename.rsplit(".", 1)
-        return f"{base}_thumb.{ext}"
-
-    def __repr__(self):
-        return f"<Photo {self.filename}>"
-
-
-class Video(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    filename = db.Column(db.String(200), nullable=False)
-    original_name = db.Column(db.String(200), nullable=False)
-    caption = db.Column(db.String(200))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-
-    # Foreign keys
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
-    album_id = db.Column(db.Integer, db.ForeignKey("album.id"), nullable=False)
-
-    def __repr__(self):
-        return f"<Video {self.filename}>"
-    
-    # Add this method to get like count
-    def like_count(self):
-        return len(self.video_likes)
-
-# Add this to your models.py after the Like model
-class VideoLike(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
-    video_id = db.Column(db.Integer, db.ForeignKey("video.id"), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-
-    __table_args__ = (db.UniqueConstraint("user_id", "video_id", name="uniq_video_like"),)
-
-    video = db.relationship("Video", backref=db.backref("video_likes", lazy=True, cascade="all, delete-orphan"), uselist=False)
-
-    def __repr__(self):
-        return f"<VideoLike user={self.user_id} video={self.video_id}>"
-    
-class Tag(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(60), unique=True, nullable=False)
-
-    def __repr__(self):
-        return f"<Tag {self.name}>"
-
-
-class Like(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
-    photo_id = db.Column(db.Integer, db.ForeignKey("photo.id"), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-
-    __table_args__ = (db.UniqueConstraint("user_id", "photo_id", name="uniq_like"),)
-
-    photo = db.relationship("Photo", backref=db.backref("likes", lazy=True, cascade="all, delete-orphan"), uselist=False)
-
-    def __repr__(self):
-        return f"<Like user={self.user_id} photo={self.photo_id}>"
-
-class Comment(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    body = db.Column(db.Text, nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
-    photo_id = db.Column(db.Integer, db.ForeignKey("photo.id"), nullable=True)
-    video_id = db.Column(db.Integer, db.ForeignKey("video.id"), nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-
-    # Add relationship to User
-    user = db.relationship("User", backref="comments")
-
-    def __repr__(self):
-        return f"<Comment {self.body[:20]}>"
-    
-# Option B: Or create a separate VideoComment model
-class VideoComment(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    body = db.Column(db.Text, nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
-    video_id = db.Column(db.Integer, db.ForeignKey("video.id"), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-
-    # Add relationship to User
-    user = db.relationship("User", backref="video_comments")
-
-    def __repr__(self):
-        return f"<VideoComment {self.body[:20]}>"
-
-# Then update your Album relationships:
-Album.photos = db.relationship(
-    "Photo",
-    backref="album",
-    lazy=True,
-    cascade="all, delete-orphan",
-    foreign_keys="Photo.album_id",
-    passive_deletes=True  # Add this
-)
-Album.videos = db.relationship(
-    "Video",
-    backref="album",
-    lazy=True,
-    cascade="all, delete-orphan",
-    foreign_keys="Video.album_id",
-    passive_deletes=True  # Add this
+from datetime import datetime
+from flask_sqlalchemy import SQLAlchemy
+from flask_login import UserMixin
+from database import RoutingSession
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+# Association table for MediaItem <-> Tag many-to-many
+media_tags = db.Table(
+    "media_tags",
+    db.Column("media_id", db.Integer, db.ForeignKey("media_item.id", ondelete="CASCADE"), primary_key=True),
+    db.Column("tag_id", db.Integer, db.ForeignKey("tag.id", ondelete="CASCADE"), primary_key=True),
+)
+
+
+class User(UserMixin, db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    full_name = db.Column(db.String(120), nullable=False)
+    email = db.Column(db.String(255), unique=True, nullable=False, index=True)
+    password_hash = db.Column(db.String(255), nullable=False)
+    role = db.Column(db.String(20), default="student")  # student | editor | admin
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    # Prefix search for the share picker compares lower(full_name) ranges
+    __table_args__ = (db.Index("ix_user_name_lower", db.func.lower(full_name)),)
+
+    # Relationships
+    albums = db.relationship("Album", backref="owner", lazy=True)
+    photos = db.relationship("Photo", backref="uploader", lazy=True)
+    videos = db.relationship("Video", backref="uploader", lazy=True)
+
+    # Role helpers
+    def is_faculty(self):
+        return self.role == "editor"
+
+    def is_admin(self):
+        return self.role == "admin"
+
+    def is_editor(self):
+        return self.role in ("editor", "admin")
+
+    def __repr__(self):
+        return f"<User {self.full_name}>"
+
+
+class Album(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(140), nullable=False)
+    description = db.Column(db.Text)
+    visibility = db.Column(db.String(20), default="public")  # public | private
+    cover_photo_id = db.Column(db.Integer, db.ForeignKey("media_item.id"), nullable=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    members = db.relationship("AlbumMember", backref="album", lazy=True, cascade="all, delete-orphan")
+
+    def __repr__(self):
+        return f"<Album {self.title}>"
+
+
+class AlbumMember(db.Model):
+    """A user a private album is shared with; see sharing.py."""
+    __tablename__ = "album_member"
+
+    # The primary key serves the per-album EXISTS in sharing.album_visible
+    album_id = db.Column(db.Integer, db.ForeignKey("album.id", ondelete="CASCADE"), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
+    added_by = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    user = db.relationship("User", foreign_keys=[user_id])
+
+    __table_args__ = (
+        db.Index("ix_album_member_user_created", "user_id", "created_at"),
+    )
+
+    def __repr__(self):
+        return f"<AlbumMember album={self.album_id} user={self.user_id}>"
+
+
+class MediaItem(db.Model):
+    """Photos and videos share one table so mixed feeds are a single query."""
+    __tablename__ = "media_item"
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(10), nullable=False)            # photo | video
+    filename = db.Column(db.String(255), nullable=False)       # saved name
+    original_name = db.Column(db.String(255), nullable=False)  # user upload name
+    caption = db.Column(db.String(255))
+    album_id = db.Column(db.Integer, db.ForeignKey("album.id"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Time-decayed popularity in log space, maintained by trending.py
+    trending_score = db.Column(db.Float, nullable=False, default=0.0, server_default="0")
+    # SHA-256 of the original file; `flask gallery import` skips known hashes
+    content_hash = db.Column(db.String(64))
+    # Bytes on disk for the original and its thumbnail
+    size_bytes = db.Column(db.BigInteger)
+
+    # Tags many-to-many
+    tags = db.relationship(
+        "Tag",
+        secondary=media_tags,
+        backref=db.backref("media", lazy="dynamic"),
+    )
+
+    __mapper_args__ = {"polymorphic_on": kind, "polymorphic_abstract": True}
+    # Feeds are ordered newest first, globally, per album and per uploader
+    __table_args__ = (
+        db.Index("ix_media_item_created", "created_at", "id"),
+        db.Index("ix_media_item_album_created", "album_id", "created_at", "id"),
+        db.Index("ix_media_item_user_created", "user_id", "created_at", "id"),
+        db.Index("ix_media_item_trending", "trending_score", "id"),
+        db.Index("ix_media_item_content_hash", "content_hash"),
+    )
+
+
+class Photo(MediaItem):
+    __mapper_args__ = {"polymorphic_identity": "photo"}
+
+    # 64-bit dHash (stored signed) and its four 16-bit chunks, which are
+    # indexed for multi-index Hamming search (see similar.py)
+    dhash = db.Column(db.BigInteger)
+    dhash_0 = db.Column(db.Integer)
+    dhash_1 = db.Column(db.Integer)
+    dhash_2 = db.Column(db.Integer)
+    dhash_3 = db.Column(db.Integer)
+
+    # Read from EXIF at upload (or by `flask gallery backfill-exif`); width is
+    # set for every photo that has been read, so NULL means not yet read
+    taken_at = db.Column(db.DateTime)
+    camera = db.Column(db.String(120))
+    lens = db.Column(db.String(120))
+    width = db.Column(db.Integer)
+    height = db.Column(db.Integer)
+    gps_lat = db.Column(db.Float)
+    gps_lon = db.Column(db.Float)
+
+    def thumb_name(self):
+        base, ext = self.filename.rsplit(".", 1)
+        return f"{base}_thumb.{ext}"
+
+    def __repr__(self):
+        return f"<Photo {self.filename}>"
+
+
+db.Index("ix_media_item_dhash_0", Photo.dhash_0)
+db.Index("ix_media_item_dhash_1", Photo.dhash_1)
+db.Index("ix_media_item_dhash_2", Photo.dhash_2)
+db.Index("ix_media_item_dhash_3", Photo.dhash_3)
+db.Index("ix_media_item_taken", Photo.taken_at, Photo.id)
+db.Index("ix_media_item_album_taken", Photo.album_id, Photo.taken_at, Photo.id)
+db.Index("ix_media_item_camera_taken", Photo.camera, Photo.taken_at, Photo.id)
+db.Index("ix_media_item_gps", Photo.gps_lat, Photo.gps_lon)
+
+
+class Video(MediaItem):
+    __mapper_args__ = {"polymorphic_identity": "video"}
+
+    def __repr__(self):
+        return f"<Video {self.filename}>"
+
+
+class Tag(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(60), unique=True, nullable=False)
+
+    def __repr__(self):
+        return f"<Tag {self.name}>"
+
+
+class Like(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    media_id = db.Column(db.Integer, db.ForeignKey("media_item.id"), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "media_id", name="uniq_like"),
+        db.Index("ix_like_user_created", "user_id", "created_at"),
+    )
+
+    media = db.relationship("MediaItem", backref=db.backref("likes", lazy=True, cascade="all, delete-orphan"), uselist=False)
+
+    def __repr__(self):
+        return f"<Like user={self.user_id} media={self.media_id}>"
+
+class Comment(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    body = db.Column(db.Text, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    media_id = db.Column(db.Integer, db.ForeignKey("media_item.id"), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Add relationship to User
+    user = db.relationship("User", backref="comments")
+    media = db.relationship("MediaItem", backref=db.backref("comments", lazy=True, cascade="all, delete-orphan"))
+
+    # Comment pages are read newest first per item
+    __table_args__ = (db.Index("ix_comment_media_created", "media_id", "created_at", "id"),)
+
+    def __repr__(self):
+        return f"<Comment {self.body[:20]}>"
+
+class UserStats(db.Model):
+    """Per-user counters for the profile and dashboard, maintained by activity.py."""
+    __tablename__ = "user_stats"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    album_count = db.Column(db.Integer, nullable=False, default=0)
+    photo_count = db.Column(db.Integer, nullable=False, default=0)
+    video_count = db.Column(db.Integer, nullable=False, default=0)
+    like_count = db.Column(db.Integer, nullable=False, default=0)  # likes given
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<UserStats user={self.user_id}>"
+
+
+class ActivityEntry(db.Model):
+    """A user's recent uploads and likes, newest TIMELINE_LENGTH of each kept."""
+    __tablename__ = "activity_entry"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    verb = db.Column(db.String(10), nullable=False)  # upload | like
+    media_id = db.Column(db.Integer, db.ForeignKey("media_item.id"), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    media = db.relationship("MediaItem", backref=db.backref("activity", lazy=True, cascade="all, delete-orphan"))
+
+    __table_args__ = (
+        db.Index("ix_activity_user_verb_created", "user_id", "verb", "created_at", "id"),
+        db.Index("ix_activity_media", "media_id"),
+    )
+
+    def __repr__(self):
+        return f"<ActivityEntry {self.verb} user={self.user_id} media={self.media_id}>"
+
+class StatsRollup(db.Model):
+    """Site-wide activity per hour or day bucket, maintained by rollups.py."""
+    __tablename__ = "stats_rollup"
+
+    period = db.Column(db.String(4), primary_key=True)  # hour | day
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    uploads = db.Column(db.Integer, nullable=False, default=0)
+    upload_bytes = db.Column(db.BigInteger, nullable=False, default=0)
+    likes = db.Column(db.Integer, nullable=False, default=0)
+    comments = db.Column(db.Integer, nullable=False, default=0)
+    signups = db.Column(db.Integer, nullable=False, default=0)
+    active_users = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<StatsRollup {self.period} {self.bucket_start}>"
+
+
+class StatsActiveUser(db.Model):
+    """Users already counted in a bucket's active_users."""
+    __tablename__ = "stats_active_user"
+
+    period = db.Column(db.String(4), primary_key=True)
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    user_id = db.Column(db.Integer, primary_key=True)
+
+
+class StatsTotals(db.Model):
+    """Running site totals in a single row (id 1)."""
+    __tablename__ = "stats_totals"
+
+    id = db.Column(db.Integer, primary_key=True)
+    users = db.Column(db.Integer, nullable=False, default=0)
+    albums = db.Column(db.Integer, nullable=False, default=0)
+    photos = db.Column(db.Integer, nullable=False, default=0)
+    videos = db.Column(db.Integer, nullable=False, default=0)
+    likes = db.Column(db.Integer, nullable=False, default=0)
+    comments = db.Column(db.Integer, nullable=False, default=0)
+    upload_bytes = db.Column(db.BigInteger, nullable=False, default=0)
+    thumb_bytes = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class DuplicatePhoto(db.Model):
+    """A photo's place in the near-duplicate report, written by similar.store_duplicate_groups()."""
+    __tablename__ = "duplicate_photo"
+
+    photo_id = db.Column(db.Integer, db.ForeignKey("media_item.id", ondelete="CASCADE"), primary_key=True)
+    group_id = db.Column(db.Integer, nullable=False)  # 1 is the largest group
+
+    __table_args__ = (db.Index("ix_duplicate_photo_group", "group_id", "photo_id"),)
+
+# Then update your Album relationships:
+Album.photos = db.relationship(
+    "Photo",
+    backref="album",
+    lazy=True,
+    cascade="all, delete-orphan",
+    foreign_keys="Photo.album_id",
+    passive_deletes=True  # Add this
+)
+Album.videos = db.relationship(
+    "Video",
+    backref="album",
+    lazy=True,
+    cascade="all, delete-orphan",
+    foreign_keys="Video.album_id",
+    passive_deletes=True  # Add this
 )
\ No newline at end of file
@@ -0,0 +1,136 @@
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, session
+from flask_login import UserMixin
+from sqlalchemy import select
+from models import db, User
+
+SESSION_KEY = "_principal"
+
+
+class Principal(UserMixin):
+    """
+    The logged-in user as request handling sees it: id, role and name,
+    without a database row behind it. Code that changes the user loads the
+    row with db.session.get(User, current_user.id).
+    """
+
+    def __init__(self, id, role, full_name):
+        self.id = id
+        self.role = role
+        self.full_name = full_name
+
+    # Same role helpers as User
+    def is_faculty(self):
+        return self.role == "editor"
+
+    def is_admin(self):
+        return self.role == "admin"
+
+    def is_editor(self):
+        return self.role in ("editor", "admin")
+
+    def as_tuple(self):
+        return self.id, self.role, self.full_name
+
+    def __repr__(self):
+        return f"<Principal {self.id} {self.role}>"
+
+
+class PrincipalCache:
+    """A per-process LRU of principals by user id whose entries expire after ttl seconds."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return entry[0]
+
+    def put(self, principal):
+        with self._lock:
+            self._entries[principal.id] = (principal, time.monotonic() + self.ttl)
+            self._entries.move_to_end(principal.id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _cache():
+    return current_app.extensions["principal_cache"]
+
+
+def init_principals(app):
+    app.extensions["principal_cache"] = PrincipalCache(
+        app.config["USER_CACHE_SIZE"], app.config["USER_CACHE_TTL_SECONDS"],
+    )
+
+
+def load_principal(user_id):
+    """
+    The principal for a session's user id: from the signed session snapshot
+    (if USER_SESSION_SNAPSHOT is on and it is younger than the cache TTL),
+    then the process cache, then one query for just id, role and name.
+    """
+    snapshot_enabled = current_app.config["USER_SESSION_SNAPSHOT"]
+    if snapshot_enabled:
+        snapshot = session.get(SESSION_KEY)
+        if snapshot and snapshot[0] == user_id and snapshot[3] > time.time():
+            return Principal(*snapshot[:3])
+
+    principal = _cache().get(user_id)
+    if principal is None:
+        row = db.session.execute(select(User.id, User.role, User.full_name).where(User.id == user_id)).first()
+        if row is None:
+            return None
+        principal = Principal(*row)
+        _cache().put(principal)
+    if snapshot_enabled:
+        _snapshot(principal)
+    return principal
+
+
+def _snapshot(principal):
+    session[SESSION_KEY] = [*principal.as_tuple(), time.time() + current_app.config["USER_CACHE_TTL_SECONDS"]]
+
+
+def user_changed(user):
+    """
+    Call after changing a user's role or name. Drops them from this
+    process's cache and, when the user is the one making the request, from
+    their session snapshot. Other processes and sessions pick the change up
+    within USER_CACHE_TTL_SECONDS.
+    """
+    users_changed([user.id])
+
+
+def users_changed(user_ids):
+    """user_changed for many users at once, e.g. after a bulk role update."""
+    for user_id in user_ids:
+        _cache().invalidate(user_id)
+    snapshot = session.get(SESSION_KEY)
+    if snapshot and snapshot[0] in user_ids:
+        session.pop(SESSION_KEY)
+
+
+def forget_session():
+    """Call on logout."""
+    session.pop(SESSION_KEY, None)
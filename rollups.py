@@ -0,0 +1,247 @@
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db, Album, Comment, Like, MediaItem, StatsActiveUser, StatsRollup, StatsTotals, User
+from utils import stored_sizes
+
+PERIODS = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+ROLLUP_FIELDS = ("uploads", "upload_bytes", "likes", "comments", "signups", "active_users")
+TOTALS_ID = 1
+
+
+def bucket_start(ts, period):
+    if period == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _upsert(model):
+    if db.session.get_bind(mapper=model).dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+
+def _mark_active(period, start, user_id):
+    """True if this is the user's first activity in the bucket."""
+    stmt = _upsert(StatsActiveUser).values(period=period, bucket_start=start, user_id=user_id)
+    return db.session.execute(stmt.on_conflict_do_nothing()).rowcount == 1
+
+
+def _record(user_id=None, **amounts):
+    """Adds amounts to the current hour and day buckets in one upsert each."""
+    now = datetime.utcnow()
+    for period in PERIODS:
+        start = bucket_start(now, period)
+        values = dict(amounts)
+        if user_id is not None and _mark_active(period, start, user_id):
+            values["active_users"] = 1
+        stmt = _upsert(StatsRollup).values(period=period, bucket_start=start, **values)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=["period", "bucket_start"],
+            set_={name: getattr(StatsRollup, name) + stmt.excluded[name] for name in values},
+        ))
+
+
+def _bump_totals(**deltas):
+    """Applies deltas to the totals row, if it has been built yet."""
+    values = {getattr(StatsTotals, name): getattr(StatsTotals, name) + delta for name, delta in deltas.items()}
+    values[StatsTotals.updated_at] = datetime.utcnow()
+    db.session.execute(update(StatsTotals).where(StatsTotals.id == TOTALS_ID).values(values))
+
+
+def user_registered(user):
+    _record(signups=1)
+    _bump_totals(users=1)
+
+
+def album_created(album):
+    _bump_totals(albums=1)
+
+
+def album_deleted(album):
+    _bump_totals(albums=-1)
+
+
+def media_uploaded(item):
+    upload_bytes, thumb_bytes = stored_sizes(item.filename)
+    _record(item.user_id, uploads=1, upload_bytes=upload_bytes + thumb_bytes)
+    _bump_totals(**{f"{item.kind}s": 1, "upload_bytes": upload_bytes, "thumb_bytes": thumb_bytes})
+
+
+def media_imported(user_id, rows):
+    """Batch media_uploaded for rows inserted in bulk: dicts with kind and filename."""
+    sizes = [stored_sizes(row["filename"]) for row in rows]
+    upload_bytes, thumb_bytes = sum(s[0] for s in sizes), sum(s[1] for s in sizes)
+    _record(user_id, uploads=len(rows), upload_bytes=upload_bytes + thumb_bytes)
+    _bump_totals(
+        photos=sum(1 for row in rows if row["kind"] == "photo"),
+        videos=sum(1 for row in rows if row["kind"] == "video"),
+        upload_bytes=upload_bytes, thumb_bytes=thumb_bytes,
+    )
+
+
+def media_deleted(item):
+    """Call before the item's files and row are deleted."""
+    upload_bytes, thumb_bytes = stored_sizes(item.filename)
+    likes = db.session.scalar(select(func.count()).select_from(Like).where(Like.media_id == item.id))
+    comments = db.session.scalar(select(func.count()).select_from(Comment).where(Comment.media_id == item.id))
+    _bump_totals(**{
+        f"{item.kind}s": -1, "likes": -likes, "comments": -comments,
+        "upload_bytes": -upload_bytes, "thumb_bytes": -thumb_bytes,
+    })
+
+
+def like_toggled(user_id, media_id, liked):
+    if liked:
+        _record(user_id, likes=1)
+    _bump_totals(likes=1 if liked else -1)
+
+
+def comment_posted(comment):
+    _record(comment.user_id, comments=1)
+    _bump_totals(comments=1)
+
+
+def comment_deleted(comment):
+    _bump_totals(comments=-1)
+
+
+def _folder_bytes(folder):
+    try:
+        return sum(entry.stat().st_size for entry in os.scandir(folder) if entry.is_file())
+    except OSError:
+        return 0
+
+
+def _count_totals():
+    """Site totals counted from every table and the upload folders; O(rows + files)."""
+    def count(model):
+        return db.session.scalar(select(func.count()).select_from(model))
+
+    kinds = dict(db.session.execute(select(MediaItem.kind, func.count()).group_by(MediaItem.kind)).all())
+    return dict(
+        users=count(User),
+        albums=count(Album),
+        photos=kinds.get("photo", 0),
+        videos=kinds.get("video", 0),
+        likes=count(Like),
+        comments=count(Comment),
+        upload_bytes=_folder_bytes(current_app.config["UPLOAD_FOLDER"]),
+        thumb_bytes=_folder_bytes(current_app.config["THUMB_FOLDER"]),
+    )
+
+
+def rebuild_totals():
+    """Recounts every table and walks the upload folders; O(rows + files)."""
+    totals = _count_totals()
+    db.session.execute(delete(StatsTotals).where(StatsTotals.id == TOTALS_ID))
+    return db.session.scalars(insert(StatsTotals).returning(StatsTotals), [dict(
+        id=TOTALS_ID, **totals, updated_at=datetime.utcnow(),
+    )]).one()
+
+
+def get_totals():
+    """
+    The totals row. Reads never write: until rollup-stats has built the
+    row, the totals are counted on each call into an unsaved row.
+    """
+    totals = db.session.get(StatsTotals, TOTALS_ID)
+    if totals is None:
+        totals = StatsTotals(id=TOTALS_ID, **_count_totals(), updated_at=datetime.utcnow())
+    return totals
+
+
+def rebuild_rollups(since):
+    """
+    Recomputes hour and day buckets from `since` (rounded down to a day) up
+    to now from the source tables. Upload bytes are read from disk, so
+    deleted files no longer count towards their bucket.
+    """
+    since = bucket_start(since, "day")
+    db.session.execute(delete(StatsRollup).where(StatsRollup.bucket_start >= since))
+    db.session.execute(delete(StatsActiveUser).where(StatsActiveUser.bucket_start >= since))
+
+    buckets = defaultdict(lambda: dict.fromkeys(ROLLUP_FIELDS, 0))
+    active = defaultdict(set)
+
+    def add(ts, user_id=None, **amounts):
+        for period in PERIODS:
+            key = (period, bucket_start(ts, period))
+            for name, amount in amounts.items():
+                buckets[key][name] += amount
+            if user_id is not None:
+                active[key].add(user_id)
+
+    for ts, user_id, filename in db.session.execute(
+        select(MediaItem.created_at, MediaItem.user_id, MediaItem.filename).where(MediaItem.created_at >= since)
+    ):
+        add(ts, user_id, uploads=1, upload_bytes=sum(stored_sizes(filename)))
+    for ts, user_id in db.session.execute(select(Like.created_at, Like.user_id).where(Like.created_at >= since)):
+        add(ts, user_id, likes=1)
+    for ts, user_id in db.session.execute(
+        select(Comment.created_at, Comment.user_id).where(Comment.created_at >= since)
+    ):
+        add(ts, user_id, comments=1)
+    for (ts,) in db.session.execute(select(User.created_at).where(User.created_at >= since)):
+        add(ts, signups=1)
+
+    rows = []
+    for (period, start), values in buckets.items():
+        values["active_users"] = len(active[(period, start)])
+        rows.append({"period": period, "bucket_start": start, **values})
+    if rows:
+        db.session.execute(insert(StatsRollup), rows)
+    # Only the current buckets can still gain active users
+    members = [
+        {"period": period, "bucket_start": start, "user_id": user_id}
+        for (period, start), users in active.items()
+        if start == bucket_start(datetime.utcnow(), period)
+        for user_id in users
+    ]
+    if members:
+        db.session.execute(insert(StatsActiveUser), members)
+    return len(rows)
+
+
+def prune(hourly_retention_days):
+    """Drops hourly buckets past retention and active-user marks for closed buckets."""
+    now = datetime.utcnow()
+    db.session.execute(delete(StatsRollup).where(
+        StatsRollup.period == "hour", StatsRollup.bucket_start < now - timedelta(days=hourly_retention_days),
+    ))
+    for period in PERIODS:
+        db.session.execute(delete(StatsActiveUser).where(
+            StatsActiveUser.period == period, StatsActiveUser.bucket_start < bucket_start(now, period),
+        ))
+
+
+def series(period, count):
+    """The last `count` buckets of a period, oldest first, with empty buckets zero-filled."""
+    step = PERIODS[period]
+    end = bucket_start(datetime.utcnow(), period)
+    start = end - step * (count - 1)
+    found = {
+        row.bucket_start: row
+        for row in db.session.scalars(
+            select(StatsRollup).where(StatsRollup.period == period, StatsRollup.bucket_start >= start)
+        )
+    }
+    points = []
+    for i in range(count):
+        ts = start + step * i
+        row = found.get(ts)
+        points.append({
+            "start": ts.isoformat(),
+            **{name: getattr(row, name) if row else 0 for name in ROLLUP_FIELDS},
+        })
+    return points
+
+
+def serialize_totals(totals):
+    return {
+        name: getattr(totals, name)
+        for name in ("users", "albums", "photos", "videos", "likes", "comments", "upload_bytes", "thumb_bytes")
+    }
@@ -0,0 +1,200 @@
+import os
+import random
+from bisect import bisect
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from itertools import accumulate
+from sqlalchemy import func, insert
+from werkzeug.security import generate_password_hash
+from models import db, User, Album, MediaItem, Tag, Like, Comment, media_tags
+
+DEFAULT_COUNTS = {
+    "users": 50,
+    "albums": 100,
+    "photos": 2000,
+    "videos": 200,
+    "likes": 5000,
+    "comments": 3000,
+    "tags": 100,
+}
+
+PLACEHOLDER_SIZE = (320, 240)
+
+
+def _next_id(model):
+    return (db.session.query(func.max(model.id)).scalar() or 0) + 1
+
+
+def _insert(table, rows, batch_size):
+    """
+    Inserts rows in batches through a single compiled Core insert().
+
+    Passing the rows as executemany parameters rather than baking them into
+    insert().values([...]) lets SQLAlchemy compile the statement once; it
+    then runs as a driver executemany on SQLite and as paged multi-row
+    VALUES ("insertmanyvalues") on Postgres.
+    """
+    table = getattr(table, "__table__", table)
+    for start in range(0, len(rows), batch_size):
+        db.session.execute(insert(table), rows[start:start + batch_size])
+    return len(rows)
+
+
+class Skewed:
+    """
+    Picks from a list with Zipf-like weights: the item at rank r is chosen
+    with probability proportional to 1 / r**s. The list is shuffled first so
+    popularity is not correlated with id order.
+    """
+
+    def __init__(self, rng, items, s=1.1):
+        self.rng = rng
+        self.items = list(items)
+        rng.shuffle(self.items)
+        self.cum_weights = list(accumulate(1 / (r ** s) for r in range(1, len(self.items) + 1)))
+        self.total = self.cum_weights[-1] if self.items else 0
+
+    def pick(self):
+        return self.items[bisect(self.cum_weights, self.rng.random() * self.total)]
+
+    def pick_many(self, k):
+        return self.rng.choices(self.items, cum_weights=self.cum_weights, k=k)
+
+
+def _skewed_pairs(rng, users, media, count):
+    """Draws up to `count` distinct (user, media) pairs from two skewed
+    distributions. Gives up after a bounded number of collisions so
+    saturated distributions terminate."""
+    count = min(count, len(users.items) * len(media.items))
+    pairs = set()
+    attempts = 0
+    while len(pairs) < count and attempts < 20:
+        need = count - len(pairs)
+        before = len(pairs)
+        pairs.update(zip(users.pick_many(need), media.pick_many(need)))
+        attempts = attempts + 1 if len(pairs) - before < need // 10 else 0
+    return list(pairs)[:count]
+
+
+def _write_placeholders(job):
+    """Worker: writes a flat-colour original and thumbnail per filename."""
+    from PIL import Image
+    upload_folder, thumb_folder, filenames = job
+    for name in filenames:
+        seed = int(name[4:12], 16)
+        colour = (seed * 67 % 256, seed * 131 % 256, seed * 197 % 256)
+        im = Image.new("RGB", PLACEHOLDER_SIZE, colour)
+        im.save(os.path.join(upload_folder, name), "JPEG", quality=70)
+        base, ext = name.rsplit(".", 1)
+        im.save(os.path.join(thumb_folder, f"{base}_thumb.{ext}"), "JPEG", quality=70)
+    return len(filenames)
+
+
+def write_placeholder_images(filenames, upload_folder, thumb_folder, workers=None, chunk=500):
+    """Generates placeholder files for seeded photos in a process pool."""
+    os.makedirs(upload_folder, exist_ok=True)
+    os.makedirs(thumb_folder, exist_ok=True)
+    jobs = [(upload_folder, thumb_folder, filenames[i:i + chunk]) for i in range(0, len(filenames), chunk)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return sum(pool.map(_write_placeholders, jobs))
+
+
+def seed_gallery(counts=None, password="password", seed=0, batch_size=5000):
+    """
+    Fills the database with synthetic users, albums, media, likes, comments
+    and tags. Rows are appended after any existing ones; the first seeded
+    user is an admin and every seeded user gets the same password.
+
+    Activity is skewed: a few heavy users own most albums and write most
+    likes and comments, and a few popular photos and videos receive most of
+    them. Returns the number of rows inserted per table, plus the seeded
+    photo filenames under "photo_files".
+    """
+    counts = {**DEFAULT_COUNTS, **(counts or {})}
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    year = 365 * 24 * 3600
+    inserted = {}
+
+    def when():
+        return now - timedelta(seconds=rng.randrange(year))
+
+    password_hash = generate_password_hash(password)
+    first_user = _next_id(User)
+    user_ids = list(range(first_user, first_user + counts["users"]))
+    inserted["user"] = _insert(User, [{
+        "id": uid,
+        "full_name": f"Seed User {uid}",
+        "email": f"seed{uid}@college.edu",
+        "password_hash": password_hash,
+        "role": "admin" if uid == first_user else "student",
+        "created_at": when(),
+    } for uid in user_ids], batch_size)
+    if not user_ids:
+        db.session.commit()
+        return inserted
+    users = Skewed(rng, user_ids)
+
+    first_album = _next_id(Album)
+    albums = [{
+        "id": first_album + i,
+        "title": f"Album {first_album + i}",
+        "description": "Seeded album",
+        "visibility": "public" if rng.random() < 0.8 else "private",
+        "user_id": users.pick(),
+        "created_at": when(),
+    } for i in range(counts["albums"])]
+    inserted["album"] = _insert(Album, albums, batch_size)
+    album_picker = Skewed(rng, albums, s=0.8)
+
+    def media_rows(first, kind, n, ext):
+        rows = []
+        for i, album in zip(range(first, first + n), album_picker.pick_many(n)):
+            rows.append({
+                "id": i,
+                "kind": kind,
+                "filename": f"seed{i:08x}.{ext}",
+                "original_name": f"seed_{i}.{ext}",
+                "caption": f"Seeded {kind} {i}",
+                "album_id": album["id"],
+                "user_id": album["user_id"],
+                "created_at": when(),
+            })
+        return rows
+
+    first_media = _next_id(MediaItem)
+    photos = media_rows(first_media, "photo", counts["photos"], "jpg") if albums else []
+    videos = media_rows(first_media + len(photos), "video", counts["videos"], "mp4") if albums else []
+    inserted["photo"] = _insert(MediaItem, photos, batch_size)
+    inserted["video"] = _insert(MediaItem, videos, batch_size)
+    inserted["photo_files"] = [p["filename"] for p in photos]
+    photo_ids = [p["id"] for p in photos]
+    video_ids = [v["id"] for v in videos]
+    del photos, videos
+
+    first_tag = _next_id(Tag)
+    tag_ids = list(range(first_tag, first_tag + counts["tags"]))
+    inserted["tag"] = _insert(Tag, [{"id": tid, "name": f"seedtag{tid}"} for tid in tag_ids], batch_size)
+    if tag_ids:
+        tags = Skewed(rng, tag_ids)
+        inserted["media_tags"] = _insert(media_tags, [
+            {"media_id": mid, "tag_id": tid}
+            for mid in photo_ids + video_ids
+            for tid in set(tags.pick_many(rng.randint(0, 3)))
+        ], batch_size)
+
+    media_ids = photo_ids + video_ids
+    if media_ids:
+        media = Skewed(rng, media_ids)
+        inserted["like"] = _insert(Like, [
+            {"user_id": u, "media_id": m, "created_at": when()}
+            for u, m in _skewed_pairs(rng, users, media, counts["likes"])
+        ], batch_size)
+        n_comments = counts["comments"]
+        inserted["comment"] = _insert(Comment, [
+            {"body": f"Seeded comment {i}", "user_id": u, "media_id": m, "created_at": when()}
+            for i, u, m in zip(range(n_comments), users.pick_many(n_comments), media.pick_many(n_comments))
+        ], batch_size)
+
+    db.session.commit()
+    return inserted
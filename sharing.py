@@ -0,0 +1,91 @@
+from datetime import datetime
+from sqlalchemy import delete, exists, func, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db, Album, AlbumMember, User
+import users
+
+PICKER_PAGE_SIZE = 20
+
+
+def shared_with(user_id):
+    """EXISTS over album_member's (album_id, user_id) key, correlated to Album."""
+    return exists().where(AlbumMember.album_id == Album.id, AlbumMember.user_id == user_id)
+
+
+def album_visible(user):
+    """
+    Predicate on Album for what user (current_user, possibly anonymous) can
+    see: public albums, their own, and private albums shared with them. The
+    share check is one primary-key probe per album row, so feeds cost the
+    same however many albums have been shared with the viewer.
+    """
+    if user is None or not user.is_authenticated:
+        return Album.visibility == "public"
+    return or_(Album.visibility == "public", Album.user_id == user.id, shared_with(user.id))
+
+
+def can_view(album, user):
+    if album.visibility == "public":
+        return True
+    if user is None or not user.is_authenticated:
+        return False
+    if user.is_admin() or album.user_id == user.id:
+        return True
+    return db.session.get(AlbumMember, (album.id, user.id)) is not None
+
+
+def can_manage(album, user):
+    return user.is_authenticated and (user.is_admin() or album.user_id == user.id)
+
+
+def _insert(model):
+    if db.session.get_bind(mapper=model).dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+
+def add_member(album, user_id, added_by):
+    """Shares album with a user; returns False if it already was."""
+    stmt = _insert(AlbumMember).values(
+        album_id=album.id, user_id=user_id, added_by=added_by, created_at=datetime.utcnow(),
+    ).on_conflict_do_nothing()
+    return db.session.execute(stmt).rowcount == 1
+
+
+def remove_member(album, user_id):
+    return db.session.execute(
+        delete(AlbumMember).where(AlbumMember.album_id == album.id, AlbumMember.user_id == user_id)
+    ).rowcount == 1
+
+
+def members(album):
+    return db.session.scalars(
+        select(User).join(AlbumMember, AlbumMember.user_id == User.id)
+        .where(AlbumMember.album_id == album.id)
+        .order_by(func.lower(User.full_name), User.id)
+    ).all()
+
+
+def search_users(q, album, page=1, per_page=PICKER_PAGE_SIZE):
+    """
+    Users whose name or email starts with q (case-insensitive) and who are
+    not the owner or already members, one page at a time. Returns (users,
+    has_next); no COUNT is run.
+    """
+    stmt = select(User).where(
+        User.id != album.user_id,
+        ~exists().where(AlbumMember.album_id == album.id, AlbumMember.user_id == User.id),
+    )
+    if q.strip():
+        stmt = stmt.where(users.search(q))
+    found = db.session.scalars(
+        stmt.order_by(func.lower(User.full_name), User.id).offset((page - 1) * per_page).limit(per_page + 1)
+    ).all()
+    return found[:per_page], len(found) > per_page
+
+
+def shared_albums(user_id, page, per_page=12):
+    """Albums shared with user_id, most recently shared first."""
+    return Album.query.join(AlbumMember, AlbumMember.album_id == Album.id).filter(
+        AlbumMember.user_id == user_id
+    ).order_by(AlbumMember.created_at.desc(), Album.id.desc()).paginate(page=page, per_page=per_page, error_out=False)
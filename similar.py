@@ -0,0 +1,206 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from flask import current_app
+from sqlalchemy import bindparam, delete, func, insert, or_, select, update
+from models import db, Album, DuplicatePhoto, MediaItem, Photo
+from sharing import album_visible
+
+# Multi-index hashing: the 64-bit dHash is split into CHUNKS 16-bit chunks.
+# Two hashes within Hamming distance r differ by at most r // CHUNKS bits in
+# at least one chunk, so probing each chunk's index with every value within
+# that radius finds all matches while touching only a sliver of the table.
+CHUNKS = 4
+CHUNK_BITS = 16
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+HASH_COLUMNS = ("dhash", "dhash_0", "dhash_1", "dhash_2", "dhash_3")
+
+
+def to_signed(h):
+    return h - (1 << 64) if h >= 1 << 63 else h
+
+
+def to_unsigned(v):
+    return v & ((1 << 64) - 1)
+
+
+def chunks(h):
+    return [(h >> (CHUNK_BITS * i)) & CHUNK_MASK for i in range(CHUNKS)]
+
+
+def hash_values(h):
+    """Column values for a photo with unsigned 64-bit dHash h."""
+    return dict(zip(HASH_COLUMNS, [to_signed(h), *chunks(h)]))
+
+
+def _within(value, radius):
+    """Every chunk value within `radius` bits of value."""
+    found = {value}
+    for r in range(1, radius + 1):
+        for bits in combinations(range(CHUNK_BITS), r):
+            flipped = value
+            for b in bits:
+                flipped ^= 1 << b
+            found.add(flipped)
+    return found
+
+
+def hamming(a, b):
+    return bin(to_unsigned(a) ^ to_unsigned(b)).count("1")
+
+
+def similar_photos(photo, viewer, max_distance=None, limit=6):
+    """
+    Photos whose dHash is within max_distance bits of this one, nearest
+    first, limited to albums the viewer can see. Candidates come from the
+    four chunk indexes; exact distances are checked in Python.
+    """
+    if photo.dhash is None:
+        return []
+    if max_distance is None:
+        max_distance = current_app.config["SIMILAR_PHOTO_MAX_DISTANCE"]
+    radius = max_distance // CHUNKS
+    probes = [
+        getattr(Photo, f"dhash_{i}").in_(sorted(_within(value, radius)))
+        for i, value in enumerate(chunks(to_unsigned(photo.dhash)))
+    ]
+    candidates = Photo.query.join(Album, Photo.album_id == Album.id).filter(
+        or_(*probes),
+        Photo.id != photo.id,
+        album_visible(viewer),
+    ).all()
+    scored = sorted(
+        ((hamming(photo.dhash, c.dhash), c.id, c) for c in candidates),
+        key=lambda t: t[:2],
+    )
+    return [c for d, _, c in scored if d <= max_distance][:limit]
+
+
+def duplicate_groups(max_distance=CHUNKS - 1):
+    """
+    Groups of near-identical photos across the whole table, as lists of
+    ids, largest group first. With max_distance below CHUNKS every such pair
+    shares an exact chunk, so only hashes with equal chunk values are
+    compared. Candidate pairs are generated and checked with array
+    operations; Python only sees the pairs that match.
+    """
+    import numpy as np
+
+    rows = db.session.execute(select(Photo.id, Photo.dhash).where(Photo.dhash.is_not(None))).all()
+    if not rows:
+        return []
+    ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    hashes = np.fromiter((r[1] for r in rows), dtype=np.int64, count=len(rows)).view(np.uint64)
+
+    # Identical hashes collapse first, so clusters of exact copies cost nothing
+    unique, inverse = np.unique(hashes, return_inverse=True)
+    parent = {}
+
+    def find(i):
+        while parent.get(i, i) != i:
+            parent[i] = parent.get(parent[i], parent[i])
+            i = parent[i]
+        return i
+
+    for c in range(CHUNKS):
+        keys = (unique >> np.uint64(CHUNK_BITS * c)) & np.uint64(CHUNK_MASK)
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        # Compare each hash with the one k places later in chunk order while
+        # they still share the chunk; the active set shrinks to bigger buckets
+        active = np.arange(len(order) - 1)
+        k = 1
+        while len(active):
+            active = active[active + k < len(order)]
+            active = active[keys[active] == keys[active + k]]
+            left, right = order[active], order[active + k]
+            close = np.bitwise_count(unique[left] ^ unique[right]) <= max_distance
+            for i, j in zip(left[close].tolist(), right[close].tolist()):
+                ri, rj = find(i), find(j)
+                if ri != rj:
+                    parent[ri] = rj
+            k += 1
+
+    linked = set(parent) | set(parent.values())
+    counts = np.bincount(inverse, minlength=len(unique))
+    groups = {}
+    for index, photo_id in zip(inverse.tolist(), ids.tolist()):
+        if index in linked or counts[index] > 1:
+            groups.setdefault(find(index), []).append(photo_id)
+    return sorted((sorted(g) for g in groups.values() if len(g) > 1), key=lambda g: (-len(g), g[0]))
+
+
+
+def store_duplicate_groups(batch_size=5000):
+    """
+    Replaces the duplicate_photo table with the current duplicate_groups(),
+    numbered from 1 largest first, so the admin report pages by group_id
+    instead of rescanning every hash. Returns the number of groups.
+    """
+    groups = duplicate_groups()
+    rows = [{"photo_id": photo_id, "group_id": n} for n, group in enumerate(groups, 1) for photo_id in group]
+    db.session.execute(delete(DuplicatePhoto))
+    for start in range(0, len(rows), batch_size):
+        db.session.execute(insert(DuplicatePhoto), rows[start:start + batch_size])
+    return len(groups)
+
+
+def stored_duplicate_groups(page, per_page):
+    """One page of the stored report: (groups of Photos, total groups)."""
+    total = db.session.scalar(select(func.max(DuplicatePhoto.group_id))) or 0
+    first = (page - 1) * per_page
+    rows = db.session.execute(
+        select(DuplicatePhoto.group_id, Photo)
+        .join(Photo, Photo.id == DuplicatePhoto.photo_id)
+        .where(DuplicatePhoto.group_id > first, DuplicatePhoto.group_id <= first + per_page)
+        .order_by(DuplicatePhoto.group_id, DuplicatePhoto.photo_id)
+    ).all()
+    groups = {}
+    for group_id, photo in rows:
+        groups.setdefault(group_id, []).append(photo)
+    # Photos deleted since the last run drop out; a lone survivor is not a duplicate
+    return [g for g in groups.values() if len(g) > 1], total
+
+def _hash_files(job):
+    """Worker: (photo_id, dhash) for the given thumbnails, skipping unreadable files."""
+    import numpy as np
+    from imaging import dhash_batch, dhash_pixels
+
+    thumb_folder, items = job
+    pixels, hashed = [], []
+    for photo_id, thumb in items:
+        try:
+            pixels.append(dhash_pixels(os.path.join(thumb_folder, thumb)))
+            hashed.append(photo_id)
+        except (OSError, ValueError):
+            continue
+    if not pixels:
+        return []
+    return list(zip(hashed, dhash_batch(np.stack(pixels)).tolist()))
+
+
+def hash_missing(workers=None, chunk=500, batch_size=5000):
+    """Hashes every photo without a dHash from its thumbnail, in a process pool."""
+    thumb_folder = current_app.config["THUMB_FOLDER"]
+    todo = [
+        (photo_id, "{}_thumb.{}".format(*filename.rsplit(".", 1)))
+        for photo_id, filename in db.session.execute(select(Photo.id, Photo.filename).where(Photo.dhash.is_(None)))
+    ]
+    jobs = [(thumb_folder, todo[i:i + chunk]) for i in range(0, len(todo), chunk)]
+    table = MediaItem.__table__
+    stmt = update(table).where(table.c.id == bindparam("_id")).values(
+        {name: bindparam(f"_{name}") for name in HASH_COLUMNS}
+    )
+    done = 0
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for results in pool.map(_hash_files, jobs):
+            rows += [{"_id": photo_id, **{f"_{k}": v for k, v in hash_values(h).items()}} for photo_id, h in results]
+            if len(rows) >= batch_size:
+                db.session.connection().execute(stmt, rows)
+                done += len(rows)
+                rows = []
+    if rows:
+        db.session.connection().execute(stmt, rows)
+        done += len(rows)
+    return done, len(todo)
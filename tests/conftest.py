@@ -0,0 +1,55 @@
+import struct
+import zlib
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from app import create_app
+from config import Config
+from models import db, Album, User
+
+
+@pytest.fixture
+def app(tmp_path):
+    """An app on a fresh SQLite file with an admin (id 1) who owns public album 1."""
+    class TestConfig(Config):
+        TESTING = True
+        WTF_CSRF_ENABLED = False
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'gallery.db'}"
+        SQLALCHEMY_ENGINE_OPTIONS = {}
+        SQLALCHEMY_REPLICA_URIS = []
+        UPLOAD_FOLDER = str(tmp_path / "uploads")
+        THUMB_FOLDER = str(tmp_path / "thumbs")
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all(bind_key=None)
+        db.session.add(User(id=1, full_name="Admin", email="admin@x.edu",
+                            password_hash=generate_password_hash("pw1234"), role="admin"))
+        db.session.add(Album(id=1, title="Album", visibility="public", user_id=1))
+        db.session.commit()
+    yield app
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    """A test client logged in as the admin."""
+    client = app.test_client()
+    response = client.post("/login", data={"email": "admin@x.edu", "password": "pw1234"})
+    assert response.status_code == 302
+    return client
+
+
+@pytest.fixture
+def bomb_png():
+    """
+    A PNG header declaring 15000x13000 pixels with no image data: past
+    Pillow's own decompression bomb limit, which Image.open enforces.
+    """
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", 15000, 13000, 1, 0, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(b"")) + chunk(b"IEND", b""))
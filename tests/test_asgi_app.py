@@ -0,0 +1,89 @@
+import asyncio
+import threading
+
+import pytest
+from flask import Flask, Response, request
+
+from asgi_app import GalleryASGI, wsgi_environ
+
+
+def scope(path="/", headers=(), method="GET"):
+    return {
+        "type": "http", "method": method, "path": path, "query_string": b"", "http_version": "1.1",
+        "headers": [(name.encode(), value.encode()) for name, value in headers],
+    }
+
+
+def run(app, http_scope, body=b""):
+    """Runs one request through the ASGI app; returns the sent messages."""
+    sent, requested = [], []
+
+    async def receive():
+        if not requested:
+            requested.append(True)
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.Event().wait()  # the client stays connected
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(http_scope, receive, send))
+    return sent
+
+
+def test_repeated_cookie_headers_are_joined_with_semicolons():
+    environ = wsgi_environ(scope(headers=[("cookie", "a=1"), ("cookie", "b=2"), ("accept", "text/html"),
+                                          ("accept", "*/*")]))
+
+    assert environ["HTTP_COOKIE"] == "a=1; b=2"
+    assert environ["HTTP_ACCEPT"] == "text/html,*/*"
+
+
+@pytest.fixture
+def flask_app(tmp_path):
+    flask_app = Flask(__name__)
+    flask_app.config.update(
+        ASGI_CHUNK_SIZE=64 * 1024, ASGI_SPOOL_BYTES=1024 * 1024, MAX_CONTENT_LENGTH=1024,
+        ASGI_APP_THREADS=2, ASGI_FILE_THREADS=2, UPLOAD_FOLDER=str(tmp_path), THUMB_FOLDER=str(tmp_path),
+    )
+
+    @flask_app.post("/echo")
+    def echo():
+        return request.get_data()
+
+    return flask_app
+
+
+def test_streamed_body_is_iterated_in_the_app_pool(flask_app):
+    threads = []
+
+    @flask_app.route("/stream")
+    def stream():
+        def generate():
+            for chunk in (b"one", b"two"):
+                threads.append(threading.current_thread().name)
+                yield chunk
+        return Response(generate())
+
+    sent = run(GalleryASGI(flask_app), scope("/stream"))
+
+    assert b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body") == b"onetwo"
+    assert len(threads) == 2
+    assert all(name.startswith("asgi-app") for name in threads)
+
+
+@pytest.mark.parametrize("value, status", [
+    ("abc", 400), ("-1", 400), ("1e3", 400), ("", 400), ("5000", 413),
+])
+def test_bad_or_oversized_content_length_is_refused(flask_app, value, status):
+    sent = run(GalleryASGI(flask_app), scope("/echo", [("content-length", value)], method="POST"))
+
+    assert sent[0]["type"] == "http.response.start"
+    assert sent[0]["status"] == status
+
+
+def test_body_is_passed_to_flask(flask_app):
+    sent = run(GalleryASGI(flask_app), scope("/echo", [("content-length", "5")], method="POST"), body=b"hello")
+
+    assert sent[0]["status"] == 200
+    assert b"".join(m.get("body", b"") for m in sent[1:]) == b"hello"
@@ -0,0 +1,19 @@
+import os
+
+import exif
+from models import db, Photo
+
+
+def test_backfill_marks_decompression_bombs_unreadable(app, bomb_png):
+    os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
+    with open(os.path.join(app.config["UPLOAD_FOLDER"], "bomb.png"), "wb") as f:
+        f.write(bomb_png)
+    with app.app_context():
+        db.session.add(Photo(filename="bomb.png", original_name="bomb.png", album_id=1, user_id=1))
+        db.session.commit()
+
+        assert list(exif.backfill()) == [(1, 1)]
+        photo = db.session.query(Photo).one()
+        # width 0 marks it as read, so a rerun does not retry it
+        assert photo.width == 0 and photo.taken_at is None
+        assert list(exif.backfill()) == []
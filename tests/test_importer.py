@@ -0,0 +1,41 @@
+import os
+
+from PIL import Image
+
+import importer
+from models import db, Album, Photo
+
+
+def write_image(path, size=(64, 48), color="blue"):
+    Image.new("RGB", size, color).save(path)
+
+
+def test_import_skips_decompression_bombs(app, tmp_path, bomb_png):
+    source = tmp_path / "event"
+    source.mkdir()
+    (source / "bomb.png").write_bytes(bomb_png)
+    write_image(source / "good.png")
+
+    with app.app_context():
+        counts = importer.import_media(str(source), db.session.get(Album, 1), workers=1)
+
+        assert (counts["seen"], counts["imported"], counts["failed"]) == (2, 1, 1)
+        assert "bomb.png" in counts["errors"][0]
+        photo = db.session.query(Photo).one()
+        assert photo.original_name == "good.png"
+    # Only the good original and its thumbnail were kept
+    assert os.listdir(app.config["UPLOAD_FOLDER"]) == [photo.filename]
+    assert len(os.listdir(app.config["THUMB_FOLDER"])) == 1
+
+
+def test_import_is_rerunnable_after_a_bomb(app, tmp_path, bomb_png):
+    source = tmp_path / "event"
+    source.mkdir()
+    (source / "bomb.png").write_bytes(bomb_png)
+
+    with app.app_context():
+        album = db.session.get(Album, 1)
+        for _ in range(2):
+            counts = importer.import_media(str(source), album, workers=1)
+            assert (counts["imported"], counts["failed"]) == (0, 1)
+    assert os.listdir(app.config["UPLOAD_FOLDER"]) == []
@@ -0,0 +1,95 @@
+import pytest
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+
+from app import create_app
+from config import Config
+from models import db, Album, User
+
+
+@pytest.fixture
+def app(tmp_path):
+    class TestConfig(Config):
+        TESTING = True
+        WTF_CSRF_ENABLED = False
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'primary.db'}"
+        SQLALCHEMY_ENGINE_OPTIONS = {}
+        SQLALCHEMY_REPLICA_URIS = [f"sqlite:///{tmp_path / 'replica.db'}"]
+        UPLOAD_FOLDER = str(tmp_path / "uploads")
+        THUMB_FOLDER = str(tmp_path / "thumbs")
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        # Same schema in both files, but different rows, so a page shows
+        # which database it was read from
+        for key, title in ((None, "From primary"), ("replica_0", "From replica")):
+            engine = db.engines[key]
+            db.metadata.create_all(engine)
+            with engine.begin() as conn:
+                conn.execute(User.__table__.insert(), [{
+                    "id": 1, "full_name": "Owner", "email": "owner@x.edu",
+                    "password_hash": generate_password_hash("pw1234"), "role": "student",
+                }])
+                conn.execute(Album.__table__.insert(), [{"id": 1, "title": title, "visibility": "public", "user_id": 1}])
+    yield app
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def statements(app):
+    """SQL run against each database during the test, keyed "primary" / "replica"."""
+    seen = {"primary": [], "replica": []}
+    with app.app_context():
+        for key, name in ((None, "primary"), ("replica_0", "replica")):
+            event.listen(db.engines[key], "before_cursor_execute",
+                         lambda conn, cursor, sql, *args, log=seen[name]: log.append(sql))
+    return seen
+
+
+def register(client, email):
+    return client.post("/register", data={
+        "full_name": "New User", "email": email, "password": "pw1234", "confirm": "pw1234",
+    })
+
+
+def test_get_reads_from_replica(app, statements):
+    response = app.test_client().get("/albums")
+
+    assert response.status_code == 200
+    assert b"From replica" in response.data
+    assert b"From primary" not in response.data
+    assert statements["replica"] and not statements["primary"]
+
+
+def test_post_writes_to_primary(app, statements):
+    response = register(app.test_client(), "new@x.edu")
+
+    assert response.status_code == 302
+    assert not statements["replica"]
+    assert any(sql.startswith("INSERT INTO user") for sql in statements["primary"])
+    with app.app_context():
+        for key, expected in ((None, 1), ("replica_0", 0)):
+            with db.engines[key].connect() as conn:
+                count = conn.scalar(User.__table__.select().where(User.email == "new@x.edu")
+                                    .with_only_columns(db.func.count()))
+            assert count == expected
+
+
+def test_write_pins_session_to_primary(app):
+    client = app.test_client()
+    assert register(client, "new@x.edu").status_code == 302
+    with client.session_transaction() as session:
+        assert "_primary_until" in session
+
+    # Read-your-writes: the next GET from the same session sees the primary
+    response = client.get("/albums")
+    assert b"From primary" in response.data
+
+    # Once the pin has expired, reads go back to the replica
+    with client.session_transaction() as session:
+        session["_primary_until"] = 0
+    response = client.get("/albums")
+    assert b"From replica" in response.data
+
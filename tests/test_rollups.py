@@ -0,0 +1,25 @@
+from models import db, Album, StatsTotals
+
+
+def test_admin_pages_do_not_write_totals(app, client):
+    assert client.get("/dashboard/admin").status_code == 200
+    response = client.get("/api/admin/stats")
+
+    assert response.status_code == 200
+    assert response.json["totals"]["albums"] == 1
+    assert response.json["totals"]["users"] == 1
+    with app.app_context():
+        assert db.session.get(StatsTotals, 1) is None
+
+
+def test_rollup_stats_builds_totals_and_hooks_keep_them(app, client):
+    result = app.test_cli_runner().invoke(args=["gallery", "rollup-stats"])
+    assert result.exit_code == 0, result.output
+    with app.app_context():
+        assert db.session.get(StatsTotals, 1).albums == 1
+
+    client.post("/albums/create", data={"title": "Second", "visibility": "public"})
+
+    assert client.get("/api/admin/stats").json["totals"]["albums"] == 2
+    with app.app_context():
+        assert db.session.get(StatsTotals, 1).albums == db.session.query(Album).count() == 2
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import trending
+from models import db, Comment, MediaItem, Photo
+
+
+def add_photo(app, age):
+    with app.app_context():
+        created_at = datetime.utcnow() - age
+        photo = Photo(filename="p.jpg", original_name="p.jpg", album_id=1, user_id=1, created_at=created_at,
+                      trending_score=trending.event_score(created_at, "upload"))
+        db.session.add(photo)
+        db.session.commit()
+        return photo.id, photo.trending_score
+
+
+def score(app, media_id):
+    with app.app_context():
+        return db.session.get(MediaItem, media_id).trending_score
+
+
+AGES = [timedelta(minutes=5), timedelta(days=3), timedelta(weeks=6)]
+
+
+@pytest.mark.parametrize("age", AGES, ids=["new", "days", "weeks"])
+def test_like_then_unlike_restores_upload_score(app, client, age):
+    photo_id, upload_score = add_photo(app, age)
+
+    assert client.post(f"/api/photos/{photo_id}/like").json["liked"] is True
+    assert score(app, photo_id) > upload_score
+    assert client.post(f"/api/photos/{photo_id}/like").json["liked"] is False
+
+    assert score(app, photo_id) == pytest.approx(upload_score, abs=1e-9)
+
+
+@pytest.mark.parametrize("age", AGES, ids=["new", "days", "weeks"])
+def test_comment_then_delete_restores_upload_score(app, client, age):
+    photo_id, upload_score = add_photo(app, age)
+
+    client.post(f"/photos/{photo_id}/comment", data={"body": "nice"})
+    assert score(app, photo_id) > upload_score
+    with app.app_context():
+        comment_id = db.session.query(Comment.id).filter_by(media_id=photo_id).scalar()
+    client.post(f"/comments/{comment_id}/delete")
+
+    assert score(app, photo_id) == pytest.approx(upload_score, abs=1e-9)
+
+
+def test_removing_one_event_keeps_the_others(app, client):
+    photo_id, upload_score = add_photo(app, timedelta(weeks=6))
+    client.post(f"/photos/{photo_id}/comment", data={"body": "nice"})
+    client.post(f"/api/photos/{photo_id}/like")
+
+    client.post(f"/api/photos/{photo_id}/like")  # unlike
+
+    with app.app_context():
+        comment = db.session.query(Comment).filter_by(media_id=photo_id).one()
+        expected = trending.logaddexp(upload_score, trending.event_score(comment.created_at, "comment"))
+    assert score(app, photo_id) == pytest.approx(expected, abs=1e-9)
+
+
+def test_incremental_scores_match_refresh(app, client):
+    photo_id, _ = add_photo(app, timedelta(weeks=6))
+    other_id, _ = add_photo(app, timedelta(days=1))
+    for media_id in (photo_id, other_id, photo_id):
+        client.post(f"/api/photos/{media_id}/like")
+    client.post(f"/photos/{other_id}/comment", data={"body": "nice"})
+    incremental = {i: score(app, i) for i in (photo_id, other_id)}
+
+    with app.app_context():
+        trending.refresh_scores()
+        db.session.commit()
+
+    for media_id, value in incremental.items():
+        assert score(app, media_id) == pytest.approx(value, abs=1e-9)
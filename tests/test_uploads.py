@@ -0,0 +1,46 @@
+import io
+import os
+
+from PIL import Image
+
+from models import db, Photo
+
+
+def upload(client, data, name):
+    return client.post("/photos/upload", data={
+        "album": 1, "caption": "", "tags": "", "image": (io.BytesIO(data), name),
+    }, content_type="multipart/form-data", follow_redirects=True)
+
+
+def test_upload_over_pillow_bomb_limit_is_rejected(app, client, bomb_png):
+    response = upload(client, bomb_png, "bomb.png")
+
+    assert response.status_code == 200
+    assert b"Image dimensions are too large." in response.data
+    assert os.listdir(app.config["UPLOAD_FOLDER"]) == []
+    with app.app_context():
+        assert db.session.query(Photo).count() == 0
+
+
+def test_upload_over_configured_budget_is_rejected(app, client):
+    app.config["MAX_IMAGE_PIXELS"] = 1000
+    buffer = io.BytesIO()
+    Image.new("RGB", (50, 50), "blue").save(buffer, "PNG")
+
+    response = upload(client, buffer.getvalue(), "big.png")
+
+    assert b"Image dimensions are too large." in response.data
+    assert os.listdir(app.config["UPLOAD_FOLDER"]) == []
+
+
+def test_upload_within_budget_is_saved(app, client):
+    buffer = io.BytesIO()
+    Image.new("RGB", (50, 40), "blue").save(buffer, "PNG")
+
+    response = upload(client, buffer.getvalue(), "ok.png")
+
+    assert b"Photo uploaded." in response.data
+    with app.app_context():
+        photo = db.session.query(Photo).one()
+        assert (photo.width, photo.height) == (50, 40)
+    assert len(os.listdir(app.config["UPLOAD_FOLDER"])) == 1
@@ -0,0 +1,82 @@
+import io
+import os
+import zipfile
+from datetime import datetime
+
+import pytest
+
+from zipstream import CHUNK_SIZE, ZipEntry, ZipStream
+
+
+@pytest.fixture
+def entries(tmp_path):
+    files = [
+        ("empty.txt", b""),
+        ("small.jpg", b"hello world" * 10),
+        ("large.mp4", os.urandom(3 * CHUNK_SIZE + 123)),
+        ("café – 1.png", os.urandom(5000)),
+    ]
+    result = []
+    for n, (name, data) in enumerate(files):
+        path = tmp_path / f"file{n}"
+        path.write_bytes(data)
+        result.append(ZipEntry(name, str(path), len(data), datetime(2024, 5, 17, 13, 45, 30)))
+    return result
+
+
+def boundaries(stream):
+    """(kind, index, start, end) of each part of the archive."""
+    parts, position = [], 0
+    for kind, i, length in stream._parts:
+        parts.append((kind, i, position, position + length))
+        position += length
+    return parts
+
+
+def test_archive_is_a_valid_zip(entries):
+    stream = ZipStream(entries)
+    data = b"".join(stream.iter_range())
+
+    assert len(data) == len(stream)
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.testzip() is None
+        assert archive.namelist() == [e.name for e in entries]
+        for entry in entries:
+            with open(entry.path, "rb") as f:
+                assert archive.read(entry.name) == f.read()
+            assert archive.getinfo(entry.name).date_time == (2024, 5, 17, 13, 45, 30)
+
+
+def test_ranges_match_the_full_archive(entries):
+    full = b"".join(ZipStream(entries).iter_range())
+    parts = {(kind, i): (start, end) for kind, i, start, end in boundaries(ZipStream(entries))}
+    local_start, local_end = parts[("local", 1)]
+    data_start, data_end = parts[("data", 2)]
+    descriptor_start, _ = parts[("descriptor", 2)]
+    central_start, central_end = parts[("central", None)]
+    end_start, end_end = parts[("end", None)]
+    ranges = [
+        (0, 10),                                          # inside the first header
+        (local_start + 5, data_start + 7),                # header into data of later members
+        (data_start + 1, data_end - 1),                   # inside data, across read chunks
+        (data_start + CHUNK_SIZE - 3, data_start + CHUNK_SIZE + 3),
+        (descriptor_start + 4, descriptor_start + 12),    # inside a data descriptor
+        (data_end - 2, central_start + 30),               # data through to the central directory
+        (central_start + 10, central_end - 10),           # inside the central directory
+        (central_start + 46, end_end),                    # central directory through the end record
+        (end_start + 3, end_end),                         # inside the end record
+        (0, len(full)),
+    ]
+    for start, stop in ranges:
+        # A fresh stream, so CRCs in descriptors and the central directory
+        # are computed without the members having been streamed first
+        assert b"".join(ZipStream(entries).iter_range(start, stop)) == full[start:stop], (start, stop)
+
+
+def test_resumed_download_is_a_valid_zip(entries):
+    stream = ZipStream(entries)
+    cut = boundaries(stream)[4][2] + 17  # partway into the second member's data
+    data = b"".join(stream.iter_range(0, cut)) + b"".join(ZipStream(entries).iter_range(cut))
+
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.testzip() is None
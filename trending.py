@@ -0,0 +1,125 @@
+import math
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import bindparam, case, func, select, update
+from models import db, Comment, Like, MediaItem
+
+# Scores are stored as log(sum(weight * exp(rate * (t - EPOCH)))) over an
+# item's upload, likes and comments. Every item decays at the same rate, so
+# ordering by this value is ordering by the time-decayed score at any
+# moment, and a new event only ever adds one term: no periodic rescoring.
+EPOCH = datetime(2024, 1, 1)
+WEIGHTS = {"upload": 1.0, "like": 1.0, "comment": 2.0}
+# Removing a term that is nearly all of the score leaves only rounding error
+# (e.g. unliking an old item whose score is its one like), so below this gap
+# the item is rescored from its rows instead of subtracting
+MIN_REMOVE_GAP = 1e-6
+
+
+def logaddexp(a, b):
+    hi, lo = max(a, b), min(a, b)
+    return hi + math.log1p(math.exp(lo - hi))
+
+
+def logsubexp(a, b):
+    """log(exp(a) - exp(b)); leaves a unchanged if b is not smaller."""
+    if b >= a:
+        return a
+    return a + math.log1p(-math.exp(b - a))
+
+
+# Registered on SQLite connections; Postgres uses the SQL in _combine
+SQLITE_FUNCTIONS = {"logaddexp": (2, logaddexp), "logsubexp": (2, logsubexp)}
+
+
+def event_score(ts, kind):
+    """One event's term in log space: log(weight) + rate * (ts - EPOCH)."""
+    rate = math.log(2) / (current_app.config["TRENDING_HALF_LIFE_HOURS"] * 3600)
+    return math.log(WEIGHTS[kind]) + rate * (ts - EPOCH).total_seconds()
+
+
+def _combine(name, score, term):
+    if db.session.get_bind(mapper=MediaItem).dialect.name == "sqlite":
+        return getattr(func, name)(score, term)
+    if name == "logaddexp":
+        return func.greatest(score, term) + func.ln(1 + func.exp(-func.abs(score - term)))
+    return case((term < score, score + func.ln(1 - func.exp(term - score))), else_=score)
+
+
+def _apply(name, media_id, term):
+    db.session.execute(
+        update(MediaItem)
+        .where(MediaItem.id == media_id)
+        .values(trending_score=_combine(name, MediaItem.trending_score, term))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def media_uploaded(item):
+    """Call after the item has been flushed, so created_at is set."""
+    item.trending_score = event_score(item.created_at, "upload")
+
+
+def _remove(media_id, term):
+    """Subtracts an event's term, or rescores the item when that would lose precision."""
+    result = db.session.execute(
+        update(MediaItem)
+        .where(MediaItem.id == media_id, MediaItem.trending_score - term > MIN_REMOVE_GAP)
+        .values(trending_score=_combine("logsubexp", MediaItem.trending_score, term))
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        rescore(media_id)
+
+
+def like_toggled(media_id, liked, liked_at):
+    """Call after the like row has been inserted or deleted."""
+    if liked:
+        _apply("logaddexp", media_id, event_score(liked_at, "like"))
+    else:
+        _remove(media_id, event_score(liked_at, "like"))
+
+
+def comment_posted(comment):
+    _apply("logaddexp", comment.media_id, event_score(comment.created_at or datetime.utcnow(), "comment"))
+
+
+def comment_deleted(comment):
+    """Call after the comment has been deleted and flushed."""
+    _remove(comment.media_id, event_score(comment.created_at, "comment"))
+
+
+def rescore(media_id):
+    """Recomputes one item's score from its upload, likes and comments."""
+    created_at = db.session.scalar(select(MediaItem.created_at).where(MediaItem.id == media_id))
+    if created_at is None:
+        return
+    score = event_score(created_at, "upload")
+    for model, kind in ((Like, "like"), (Comment, "comment")):
+        for ts in db.session.scalars(select(model.created_at).where(model.media_id == media_id)):
+            score = logaddexp(score, event_score(ts, kind))
+    db.session.execute(
+        update(MediaItem)
+        .where(MediaItem.id == media_id)
+        .values(trending_score=score)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def refresh_scores(batch_size=5000):
+    """Recomputes every item's score from its upload, likes and comments."""
+    scores = {
+        media_id: event_score(created_at, "upload")
+        for media_id, created_at in db.session.execute(select(MediaItem.id, MediaItem.created_at))
+    }
+    for model, kind in ((Like, "like"), (Comment, "comment")):
+        for media_id, created_at in db.session.execute(select(model.media_id, model.created_at)):
+            if media_id in scores:
+                scores[media_id] = logaddexp(scores[media_id], event_score(created_at, kind))
+
+    table = MediaItem.__table__
+    stmt = update(table).where(table.c.id == bindparam("_id")).values(trending_score=bindparam("_score"))
+    rows = [{"_id": media_id, "_score": score} for media_id, score in scores.items()]
+    for start in range(0, len(rows), batch_size):
+        db.session.connection().execute(stmt, rows[start:start + batch_size])
+    return len(rows)
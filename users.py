@@ -0,0 +1,124 @@
+import csv
+import io
+from sqlalchemy import bindparam, func, or_, select, tuple_, update
+from comments import decode_cursor, encode_cursor
+from models import db, MediaItem, User
+from utils import stored_sizes
+
+PAGE_SIZE = 50
+ROLES = ("student", "editor", "admin")
+# Emails per IN list when resolving a CSV
+EMAIL_BATCH = 500
+
+
+def _prefix(column, prefix):
+    # A range rather than LIKE, so plain b-tree indexes serve it on SQLite and Postgres
+    return (column >= prefix) & (column < prefix + "\uffff")
+
+
+def search(q):
+    """Predicate for users whose name or email starts with q, case-insensitively."""
+    q = q.strip().lower()
+    return or_(_prefix(func.lower(User.full_name), q), _prefix(User.email, q))
+
+
+def user_page(q="", cursor=None, limit=PAGE_SIZE):
+    """
+    One page of users, newest first, keyed on (created_at, id) like
+    comment_page. A search narrows the rows through the name and email
+    indexes before they are sorted. Returns (users, next_cursor).
+    """
+    stmt = select(User).order_by(User.created_at.desc(), User.id.desc()).limit(limit + 1)
+    if q.strip():
+        stmt = stmt.where(search(q))
+    if cursor:
+        stmt = stmt.where(tuple_(User.created_at, User.id) < decode_cursor(cursor))
+    users = db.session.scalars(stmt).all()
+    next_cursor = encode_cursor(users[limit - 1]) if len(users) > limit else None
+    return users[:limit], next_cursor
+
+
+def upload_totals(user_ids):
+    """{user_id: {"photo": n, "video": n, "bytes": n}} for a page of users, in one GROUP BY."""
+    totals = {user_id: {"photo": 0, "video": 0, "bytes": 0} for user_id in user_ids}
+    if not user_ids:
+        return totals
+    rows = db.session.execute(
+        select(MediaItem.user_id, MediaItem.kind, func.count(), func.coalesce(func.sum(MediaItem.size_bytes), 0))
+        .where(MediaItem.user_id.in_(user_ids))
+        .group_by(MediaItem.user_id, MediaItem.kind)
+    )
+    for user_id, kind, count, size in rows:
+        totals[user_id][kind] = count
+        totals[user_id]["bytes"] += size
+    return totals
+
+
+def set_roles(user_ids, role):
+    """Sets role on the given users in one UPDATE; returns the ids that changed."""
+    if not user_ids:
+        return []
+    return db.session.scalars(
+        update(User).where(User.id.in_(user_ids), User.role != role).values(role=role).returning(User.id)
+    ).all()
+
+
+def parse_role_csv(stream):
+    """
+    Reads "email,role" lines (a header row is allowed). Returns
+    ({email: role}, errors); errors are messages with line numbers, or a
+    single error if the file is not UTF-8.
+    """
+    assignments, errors = {}, []
+    reader = csv.reader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+    try:
+        for line, row in enumerate(reader, 1):
+            if not row or not "".join(row).strip():
+                continue
+            if len(row) < 2:
+                errors.append(f"line {line}: expected email,role")
+                continue
+            email, role = row[0].strip().lower(), row[1].strip().lower()
+            if line == 1 and email == "email":
+                continue
+            if role not in ROLES:
+                errors.append(f"line {line}: unknown role {role!r}")
+                continue
+            assignments[email] = role
+    except UnicodeDecodeError:
+        return {}, ["file is not UTF-8 text"]
+    return assignments, errors
+
+
+def resolve_emails(emails):
+    """{email: user_id} for the emails that belong to a user."""
+    emails = sorted(emails)
+    found = {}
+    for start in range(0, len(emails), EMAIL_BATCH):
+        found.update(db.session.execute(
+            select(User.email, User.id).where(User.email.in_(emails[start:start + EMAIL_BATCH]))
+        ).all())
+    return found
+
+
+def measure_storage(batch_size=1000):
+    """Fills size_bytes from disk for items without it, committing each batch. Yields the running count."""
+    table = MediaItem.__table__
+    done, last_id = 0, 0
+    while True:
+        batch = db.session.execute(
+            select(MediaItem.id, MediaItem.filename)
+            .where(MediaItem.size_bytes.is_(None), MediaItem.id > last_id)
+            .order_by(MediaItem.id)
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            return
+        db.session.connection().execute(
+            update(table).where(table.c.id == bindparam("_id")).values(size_bytes=bindparam("_size")),
+            [{"_id": media_id, "_size": sum(stored_sizes(filename))} for media_id, filename in batch],
+        )
+        db.session.commit()
+        done += len(batch)
+        last_id = batch[-1][0]
+        yield done
@@ -1,88 +1,115 @@
-import os
-import secrets
-from PIL import Image
-from werkzeug.utils import secure_filename
-from flask import current_app
-
-def allowed_file(filename: str) -> bool:
-    if "." not in filename:
-        return False
-    ext = filename.rsplit(".", 1)[1].lower()
-    return ext in current_app.config["ALLOWED_EXTENSIONS"]
-
-
-def save_image(file_storage) -> tuple[str, str]:
-    """
-    Saves original image and creates a thumbnail.
-    Returns (saved_filename, original_name).
-    """
-    upload_folder = current_app.config["UPLOAD_FOLDER"]
-    thumb_folder = current_app.config["THUMB_FOLDER"]
-    os.makedirs(upload_folder, exist_ok=True)
-    os.makedirs(thumb_folder, exist_ok=True)
-
-    original_name = secure_filename(file_storage.filename)
-    ext = original_name.rsplit(".", 1)[1].lower()
-    rand = secrets.token_hex(8)
-    saved_filename = f"{rand}.{ext}"
-
-    original_path = os.path.join(upload_folder, saved_filename)
-    file_storage.save(original_path)
-
-    # Create thumbnail
-    thumb_path = os.path.join(thumb_folder, f"{rand}_thumb.{ext}")
-    with Image.open(original_path) as im:
-        im.thumbnail(current_app.config["THUMB_SIZE"])
-        im.save(thumb_path)
-
-    return saved_filename, original_name
-
-# utils.py
-def save_video(file_storage) -> tuple[str, str]:
-    """
-    Saves uploaded video without processing.
-    Returns (saved_filename, original_name).
-    """
-    upload_folder = current_app.config["UPLOAD_FOLDER"]
-    os.makedirs(upload_folder, exist_ok=True)
-
-    original_name = secure_filename(file_storage.filename)
-    ext = original_name.rsplit(".", 1)[1].lower()
-    rand = secrets.token_hex(8)
-    saved_filename = f"{rand}.{ext}"
-
-    save_path = os.path.join(upload_folder, saved_filename)
-    file_storage.save(save_path)
-
-    return saved_filename, original_name
-
-# Add these functions to your utils.py
-def delete_image(filename: str):
-    """Delete original image and its thumbnail"""
-    upload_folder = current_app.config["UPLOAD_FOLDER"]
-    thumb_folder = current_app.config["THUMB_FOLDER"]
-    
-    # Delete original image
-    original_path = os.path.join(upload_folder, filename)
-    if os.path.exists(original_path):
-        os.remove(original_path)
-    
-    # Delete thumbnail
-    base, ext = filename.rsplit(".", 1)
-    thumb_filename = f"{base}_thumb.{ext}"
-    thumb_path = os.path.join(thumb_folder, thumb_filename)
-    if os.path.exists(thumb_path):
-        os.remove(thumb_path)
-
-def delete_video(filename: str):
-    """Delete video file"""
-    upload_folder = current_app.config["UPLOAD_FOLDER"]
-    video_path = os.path.join(upload_folder, filename)
-    if os.path.exists(video_path):
-        os.remove(video_path)
-        
-def parse_tags(tag_string: str):
-    if not tag_string:
-        return []
-    tags = [t.strip().lower() for t in tag_string.split(",")]
-    return [t for t in tags if t]
+import hashlib
+import os
+import secrets
+from werkzeug.utils import secure_filename
+from flask import current_app
+
+def allowed_file(filename: str) -> bool:
+    if "." not in filename:
+        return False
+    ext = filename.rsplit(".", 1)[1].lower()
+    return ext in current_app.config["ALLOWED_EXTENSIONS"]
+
+
+def save_image(file_storage) -> tuple[str, str, int, dict]:
+    """
+    Saves original image and creates a thumbnail.
+    Returns (saved_filename, original_name, dhash, metadata): the dHash is of
+    the thumbnail, the metadata is read_metadata() of the original.
+    Raises ImageTooLarge (and removes the saved original) if the image is
+    over the MAX_IMAGE_PIXELS budget.
+    """
+    # Imported here so that workers which never take an upload never load Pillow
+    from imaging import dhash, make_thumbnail, read_metadata, ImageTooLarge
+
+    upload_folder = current_app.config["UPLOAD_FOLDER"]
+    thumb_folder = current_app.config["THUMB_FOLDER"]
+    os.makedirs(upload_folder, exist_ok=True)
+    os.makedirs(thumb_folder, exist_ok=True)
+
+    original_name = secure_filename(file_storage.filename)
+    ext = original_name.rsplit(".", 1)[1].lower()
+    rand = secrets.token_hex(8)
+    saved_filename = f"{rand}.{ext}"
+
+    original_path = os.path.join(upload_folder, saved_filename)
+    file_storage.save(original_path)
+
+    # Create thumbnail
+    thumb_path = os.path.join(thumb_folder, f"{rand}_thumb.{ext}")
+    try:
+        make_thumbnail(
+            original_path,
+            thumb_path,
+            current_app.config["THUMB_SIZE"],
+            max_pixels=current_app.config["MAX_IMAGE_PIXELS"],
+        )
+    except ImageTooLarge:
+        os.remove(original_path)
+        raise
+
+    return saved_filename, original_name, dhash(thumb_path), read_metadata(original_path)
+
+# utils.py
+def save_video(file_storage) -> tuple[str, str]:
+    """
+    Saves uploaded video without processing.
+    Returns (saved_filename, original_name).
+    """
+    upload_folder = current_app.config["UPLOAD_FOLDER"]
+    os.makedirs(upload_folder, exist_ok=True)
+
+    original_name = secure_filename(file_storage.filename)
+    ext = original_name.rsplit(".", 1)[1].lower()
+    rand = secrets.token_hex(8)
+    saved_filename = f"{rand}.{ext}"
+
+    save_path = os.path.join(upload_folder, saved_filename)
+    file_storage.save(save_path)
+
+    return saved_filename, original_name
+
+def stored_sizes(filename: str) -> tuple[int, int]:
+    """Bytes on disk for an upload and its thumbnail (0 if missing)."""
+    base, ext = filename.rsplit(".", 1)
+    paths = (
+        os.path.join(current_app.config["UPLOAD_FOLDER"], filename),
+        os.path.join(current_app.config["THUMB_FOLDER"], f"{base}_thumb.{ext}"),
+    )
+    return tuple(os.path.getsize(p) if os.path.exists(p) else 0 for p in paths)
+
+def content_hash(filename: str) -> str:
+    """SHA-256 hex digest of a stored upload."""
+    with open(os.path.join(current_app.config["UPLOAD_FOLDER"], filename), "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+# Add these functions to your utils.py
+def delete_image(filename: str):
+    """Delete original image and its thumbnail"""
+    upload_folder = current_app.config["UPLOAD_FOLDER"]
+    thumb_folder = current_app.config["THUMB_FOLDER"]
+    
+    # Delete original image
+    original_path = os.path.join(upload_folder, filename)
+    if os.path.exists(original_path):
+        os.remove(original_path)
+    
+    # Delete thumbnail
+    base, ext = filename.rsplit(".", 1)
+    thumb_filename = f"{base}_thumb.{ext}"
+    thumb_path = os.path.join(thumb_folder, thumb_filename)
+    if os.path.exists(thumb_path):
+        os.remove(thumb_path)
+
+def delete_video(filename: str):
+    """Delete video file"""
+    upload_folder = current_app.config["UPLOAD_FOLDER"]
+    video_path = os.path.join(upload_folder, filename)
+    if os.path.exists(video_path):
+        os.remove(video_path)
+        
+def parse_tags(tag_string: str):
+    if not tag_string:
+        return []
+    tags = [t.strip().lower() for t in tag_string.split(",")]
+    return [t for t in tags if t]
@@ -0,0 +1,9 @@
+"""
+Route blueprints, registered by create_app(). Each module keeps its
+imports to what its own views need; Pillow, numpy and the media-processing
+modules are imported inside the views that use them, so starting a worker
+or a CLI command does not pay for them.
+"""
+from views import admin, albums, auth, gallery, media
+
+BLUEPRINTS = (auth.bp, gallery.bp, albums.bp, media.bp, admin.bp)
@@ -0,0 +1,148 @@
+from math import ceil
+from flask import Blueprint, render_template, redirect, url_for, flash, request, abort, jsonify
+from flask_login import login_required, current_user
+from models import db, User
+from principal import user_changed, users_changed
+from similar import stored_duplicate_groups
+import rollups
+import users
+
+bp = Blueprint("admin", __name__)
+
+
+def admin_required():
+    if not current_user.is_authenticated or not current_user.is_admin():
+        abort(403)
+
+
+@bp.route("/dashboard/admin")
+@login_required
+def admin_dashboard():
+    if not current_user.is_admin():
+        abort(403)
+    # Totals come from the one-row stats_totals table; the charts load
+    # their rollups from api_admin_stats
+    totals = rollups.get_totals()
+    recent_users = User.query.order_by(User.created_at.desc()).limit(5).all()
+
+    return render_template("admin/dashboard.html",
+                        totals=totals,
+                        total_users=totals.users,
+                        total_albums=totals.albums,
+                        total_photos=totals.photos,
+                        recent_users=recent_users,
+                        upload_size=totals.upload_bytes,
+                        thumb_size=totals.thumb_bytes,
+                        total_storage=totals.upload_bytes + totals.thumb_bytes)
+
+
+@bp.route("/api/admin/stats")
+@login_required
+def api_admin_stats():
+    if not current_user.is_admin():
+        return jsonify(error="Forbidden"), 403
+    period = request.args.get("period", "day")
+    if period not in rollups.PERIODS:
+        return jsonify(error="period must be hour or day"), 400
+    count = min(max(request.args.get("count", 30, type=int), 1), 366)
+    return jsonify(
+        period=period,
+        buckets=rollups.series(period, count),
+        totals=rollups.serialize_totals(rollups.get_totals()),
+    )
+
+
+@bp.route("/admin/users")
+@login_required
+def admin_users():
+    admin_required()
+    q = request.args.get("q", "")
+    try:
+        page_users, next_cursor = users.user_page(q, request.args.get("cursor"))
+    except ValueError:
+        abort(400)
+    return render_template(
+        "admin/users.html",
+        users=page_users,
+        totals=users.upload_totals([u.id for u in page_users]),
+        q=q,
+        cursor=request.args.get("cursor"),
+        next_cursor=next_cursor,
+    )
+
+
+@bp.post("/admin/users/roles")
+@login_required
+def admin_bulk_roles():
+    """Role changes for the checked users, or for every email,role line of an uploaded CSV, in one transaction."""
+    admin_required()
+    upload = request.files.get("csv")
+    if upload and upload.filename:
+        assignments, errors = users.parse_role_csv(upload.stream)
+        found = users.resolve_emails(assignments)
+        errors += [f"no user with email {email}" for email in sorted(assignments.keys() - found.keys())]
+        if errors:
+            flash("CSV not applied: " + "; ".join(errors[:10]) + (" …" if len(errors) > 10 else ""), "danger")
+            return redirect(url_for("admin.admin_users"))
+        by_role = {}
+        for email, role in assignments.items():
+            by_role.setdefault(role, []).append(found[email])
+    else:
+        role = request.form.get("role", "")
+        if role not in users.ROLES:
+            abort(400)
+        by_role = {role: request.form.getlist("user_ids", type=int)}
+
+    # Same rule as admin_set_role: admins cannot demote themselves
+    for role, ids in by_role.items():
+        if role != "admin" and current_user.id in ids:
+            ids.remove(current_user.id)
+            flash("Admins cannot demote themselves here.", "warning")
+    changed = [user_id for role, ids in by_role.items() for user_id in users.set_roles(ids, role)]
+    db.session.commit()
+    users_changed(changed)
+    flash(f"Updated {len(changed)} user{'s' if len(changed) != 1 else ''}.", "success")
+    return redirect(url_for("admin.admin_users", q=request.form.get("q") or None))
+
+
+@bp.post("/admin/users/<int:user_id>/role")
+@login_required
+def admin_set_role(user_id):
+    admin_required()
+    role = request.form.get("role", "student")
+    if role not in ("student", "editor", "admin"):
+        abort(400)
+    if current_user.id == user_id and role != "admin":
+        flash("Admins cannot demote themselves here.", "warning")
+        return redirect(url_for("admin.admin_users"))
+    user = User.query.get_or_404(user_id)
+    user.role = role
+    db.session.commit()
+    user_changed(user)
+    flash("Role updated.", "success")
+    return redirect(url_for("admin.admin_users"))
+
+
+@bp.route("/admin/duplicates")
+@login_required
+def admin_duplicates():
+    admin_required()
+    page = max(request.args.get("page", 1, type=int), 1)
+    per_page = 20
+    # Groups are computed by `gallery find-duplicates` (also run by
+    # hash-photos), not on page load
+    groups, total_groups = stored_duplicate_groups(page, per_page)
+    return render_template(
+        "admin/duplicates.html",
+        groups=groups,
+        total_groups=total_groups,
+        page=page,
+        total_pages=ceil(total_groups / per_page) if total_groups else 1,
+    )
+
+
+@bp.route("/admin/settings")
+@login_required
+def admin_settings():
+    admin_required()
+    return render_template("admin/settings.html")
@@ -0,0 +1,185 @@
+import hashlib
+from flask import Blueprint, Response, current_app, render_template, redirect, url_for, flash, request, abort
+from flask_login import login_required, current_user
+from werkzeug.utils import secure_filename
+from models import db, User, Album, MediaItem
+from forms import AlbumForm
+from utils import delete_image, delete_video
+from activity import album_created, album_deleted, media_deleted
+from sharing import album_visible, can_view
+from zipstream import ZipStream, album_entries
+import exif
+import rollups
+import sharing
+
+bp = Blueprint("albums", __name__)
+
+
+def get_album_items(album_id):
+    return MediaItem.query.filter_by(album_id=album_id).order_by(
+        MediaItem.created_at.desc(), MediaItem.id.desc()
+    ).all()
+
+
+def get_visible_albums_query():
+    return Album.query.filter(album_visible(current_user))
+
+
+@bp.route("/albums")
+def albums_list():
+    page = request.args.get("page", 1, type=int)
+    query = Album.query
+    if not (current_user.is_authenticated and current_user.is_admin()):
+        query = get_visible_albums_query()
+
+    albums = query.order_by(Album.created_at.desc()).paginate(page=page, per_page=10, error_out=False)
+    return render_template("albums/list.html", albums=albums)
+
+
+@bp.route("/albums/create", methods=["GET", "POST"])
+@login_required
+def album_create():
+    form = AlbumForm()
+    if form.validate_on_submit():
+        album = Album(
+            title=form.title.data,
+            description=form.description.data,
+            visibility=form.visibility.data,
+            user_id=current_user.id
+        )
+        db.session.add(album)
+        album_created(album)
+        rollups.album_created(album)
+        db.session.commit()
+        flash("Album created.", "success")
+        return redirect(url_for("albums.albums_list"))
+    return render_template("albums/create.html", form=form)
+
+
+@bp.route("/album/<int:album_id>")
+def album_detail(album_id):
+    page = request.args.get("page", 1, type=int)
+    per_page = 12
+
+    album = Album.query.get_or_404(album_id)
+    if not can_view(album, current_user):
+        abort(404)
+
+    filters = exif.parse_filters(request.args)
+    pagination = exif.apply_filters(
+        MediaItem.query.filter(MediaItem.album_id == album.id), filters
+    ).paginate(page=page, per_page=per_page, error_out=False)
+    items = pagination.items
+    total_pages = pagination.pages or 1
+    return render_template(
+        "albums/detail.html",
+        album=album,
+        items=items,
+        page=page,
+        total_pages=total_pages,
+        filters=filters,
+        filter_args=exif.filter_args(filters),
+        cameras=exif.cameras(current_user, album.id),
+    )
+
+
+@bp.route("/album/<int:album_id>/download")
+def album_download(album_id):
+    album = Album.query.get_or_404(album_id)
+    if not can_view(album, current_user):
+        abort(404)
+
+    items = MediaItem.query.filter(MediaItem.album_id == album.id).order_by(
+        MediaItem.created_at.asc(), MediaItem.id.asc()
+    ).all()
+    archive = ZipStream(album_entries(items, current_app.config["UPLOAD_FOLDER"]))
+    etag = hashlib.sha1(repr([
+        (e.name, e.size, e.mtime.isoformat()) for e in archive.entries
+    ]).encode()).hexdigest()
+
+    # One byte range is honoured, and only while the archive is unchanged
+    start, stop, status = 0, len(archive), 200
+    if request.range and ("If-Range" not in request.headers or request.if_range.etag == etag):
+        byte_range = request.range.range_for_length(len(archive))
+        if byte_range is None:
+            response = Response(status=416)
+            response.headers["Content-Range"] = f"bytes */{len(archive)}"
+            return response
+        start, stop = byte_range
+        status = 206
+
+    response = Response(archive.iter_range(start, stop), status=status, mimetype="application/zip",
+                        direct_passthrough=True)
+    response.content_length = stop - start
+    if status == 206:
+        response.headers["Content-Range"] = f"bytes {start}-{stop - 1}/{len(archive)}"
+    response.headers["Accept-Ranges"] = "bytes"
+    response.headers["Content-Disposition"] = "attachment; filename=" + (
+        f"{secure_filename(album.title) or f'album-{album.id}'}.zip"
+    )
+    response.set_etag(etag)
+    return response
+
+
+@bp.post("/albums/<int:album_id>/delete")
+@login_required
+def delete_album(album_id):
+    album = Album.query.get_or_404(album_id)
+
+    if not (current_user.is_admin() or album.user_id == current_user.id):
+        abort(403)
+
+    album_deleted(album)
+    rollups.album_deleted(album)
+    for item in get_album_items(album.id):
+        media_deleted(item)
+        rollups.media_deleted(item)
+        item.tags.clear()
+        if item.kind == "photo":
+            delete_image(item.filename)
+        else:
+            delete_video(item.filename)
+        db.session.delete(item)
+    db.session.delete(album)
+    db.session.commit()
+
+    flash("Album and all its contents deleted successfully.", "success")
+    return redirect(url_for('albums.albums_list'))
+
+
+@bp.route('/albums/shared')
+@login_required
+def shared_albums():
+    """Albums shared with the current user"""
+    page = request.args.get('page', 1, type=int)
+
+    shared_albums = sharing.shared_albums(current_user.id, page)
+
+    return render_template('albums/shared.html', albums=shared_albums)
+
+
+@bp.route('/album/<int:album_id>/share', methods=['GET', 'POST'])
+@login_required
+def share_album(album_id):
+    """Share album with specific users"""
+    album = Album.query.get_or_404(album_id)
+    if not sharing.can_manage(album, current_user):
+        abort(403)
+
+    if request.method == 'POST':
+        user_id = request.form.get('user_id', type=int)
+        if user_id is None or user_id == album.user_id or db.session.get(User, user_id) is None:
+            abort(400)
+        if request.form.get('action') == 'remove':
+            if sharing.remove_member(album, user_id):
+                flash('User removed from the album.', 'info')
+        elif sharing.add_member(album, user_id, current_user.id):
+            flash('Album shared.', 'success')
+        db.session.commit()
+        return redirect(url_for('albums.share_album', album_id=album.id, q=request.form.get('q') or None))
+
+    q = request.args.get('q', '')
+    page = max(request.args.get('page', 1, type=int), 1)
+    candidates, has_next = sharing.search_users(q, album, page)
+    return render_template('albums/share.html', album=album, members=sharing.members(album),
+                           users=candidates, q=q, page=page, has_next=has_next)
@@ -0,0 +1,95 @@
+from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask_login import login_user, logout_user, login_required, current_user
+from werkzeug.security import generate_password_hash
+from models import db, User
+from forms import RegisterForm, LoginForm, EditProfileForm
+from activity import get_stats, timeline, user_registered
+from principal import forget_session, user_changed
+import rollups
+
+bp = Blueprint("auth", __name__)
+
+
+@bp.route("/register", methods=["GET", "POST"])
+def register():
+    if current_user.is_authenticated:
+        return redirect(url_for("gallery.index"))
+    form = RegisterForm()
+    if form.validate_on_submit():
+        user = User(
+            full_name=form.full_name.data,
+            email=form.email.data.lower(),
+            password_hash=generate_password_hash(form.password.data),
+            role="student",
+        )
+        db.session.add(user)
+        db.session.flush()
+        user_registered(user)
+        rollups.user_registered(user)
+        db.session.commit()
+        flash("Registration successful. Please log in.", "success")
+        return redirect(url_for("auth.login"))
+    return render_template("auth/register.html", form=form)
+
+
+@bp.route("/login", methods=["GET", "POST"])
+def login():
+    if current_user.is_authenticated:
+        return redirect(url_for("gallery.index"))
+    form = LoginForm()
+    if form.validate_on_submit():
+        login_user(form.user)
+        flash("Welcome back!", "success")
+        return redirect(url_for("gallery.index"))
+    return render_template("auth/login.html", form=form)
+
+
+@bp.route("/logout")
+@login_required
+def logout():
+    logout_user()
+    forget_session()
+    flash("Logged out.", "info")
+    return redirect(url_for("gallery.landing"))
+
+
+@bp.route('/profile')
+@login_required
+def profile():
+    """User profile page"""
+    user = db.session.get(User, current_user.id)
+    stats = get_stats(user.id)
+    recent_activity = timeline(user.id, "upload")
+
+    return render_template('user/profile.html',
+                        user=user,
+                        albums_count=stats.album_count,
+                        photos_count=stats.photo_count,
+                        videos_count=stats.video_count,
+                        recent_activity=recent_activity)
+
+
+@bp.route('/profile/edit', methods=['GET', 'POST'])
+@login_required
+def edit_profile():
+    """Edit user profile"""
+    form = EditProfileForm()
+
+    user = db.session.get(User, current_user.id)
+
+    if form.validate_on_submit():
+        user.full_name = form.full_name.data
+        user.email = form.email.data
+        if form.password.data:
+            user.password_hash = generate_password_hash(form.password.data)
+
+        db.session.commit()
+        user_changed(user)
+        flash('Your profile has been updated!', 'success')
+        return redirect(url_for('auth.profile'))
+
+    elif request.method == 'GET':
+        form.full_name.data = user.full_name
+        form.email.data = user.email
+
+    return render_template('user/edit_profile.html', form=form)
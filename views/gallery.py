@@ -0,0 +1,179 @@
+from math import ceil
+from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask_login import login_required, current_user
+from sqlalchemy import func, or_
+from sqlalchemy.orm import joinedload
+from models import db, Album, MediaItem, Tag, Like
+from forms import RegisterForm, LoginForm
+from activity import get_stats
+from sharing import album_visible
+import exif
+
+bp = Blueprint("gallery", __name__)
+
+
+def media_counts(user_id):
+    """{"photo": n, "video": m} for a user's uploads, in one query."""
+    rows = db.session.query(MediaItem.kind, func.count()).filter(
+        MediaItem.user_id == user_id
+    ).group_by(MediaItem.kind).all()
+    return {"photo": 0, "video": 0, **dict(rows)}
+
+
+@bp.route("/")
+def landing():
+    if current_user.is_authenticated:
+        return redirect(url_for("gallery.index"))
+    login_form = LoginForm()
+    register_form = RegisterForm()
+    return render_template("landing.html", login_form=login_form, register_form=register_form)
+
+
+@bp.route("/gallery")
+@login_required
+def index():
+    q = request.args.get("q", "").strip()
+    page = request.args.get("page", 1, type=int)
+    per_page = 12
+    items_q = MediaItem.query.join(Album, MediaItem.album_id == Album.id)
+    items_q = items_q.filter(album_visible(current_user))
+    if q.startswith("user:"):
+        try:
+            user_id = int(q.split(":")[1])
+            items_q = items_q.filter(MediaItem.user_id == user_id)
+        except:
+            flash("Invalid user search format", "warning")
+    elif q:
+        items_q = items_q.filter(
+            or_(
+                MediaItem.caption.ilike(f"%{q}%"),
+                MediaItem.tags.any(Tag.name.ilike(f"%{q}%")),
+                Album.title.ilike(f"%{q}%")
+            )
+        )
+    filters = exif.parse_filters(request.args)
+    pagination = exif.apply_filters(items_q, filters).paginate(
+        page=page, per_page=per_page, error_out=False
+    )
+    items = pagination.items
+    total_pages = pagination.pages or 1
+
+    return render_template(
+        "index.html",
+        items=items,
+        q=q,
+        page=page,
+        total_pages=total_pages,
+        filters=filters,
+        filter_args=exif.filter_args(filters),
+        cameras=exif.cameras(current_user),
+    )
+
+
+@bp.route("/trending")
+@login_required
+def trending_feed():
+    page = max(request.args.get("page", 1, type=int), 1)
+    per_page = 12
+    # Walks ix_media_item_trending from the top; no COUNT, so the pager
+    # only knows whether there is a next page
+    items = MediaItem.query.join(Album, MediaItem.album_id == Album.id).filter(
+        album_visible(current_user)
+    ).order_by(
+        MediaItem.trending_score.desc(), MediaItem.id.desc()
+    ).offset((page - 1) * per_page).limit(per_page + 1).all()
+    has_next = len(items) > per_page
+
+    return render_template(
+        "index.html",
+        items=items[:per_page],
+        q="",
+        page=page,
+        total_pages=page + 1 if has_next else page,
+        trending=True,
+    )
+
+
+@bp.route('/favorites')
+@login_required
+def favorites():
+    """User's favorite items"""
+    page = request.args.get('page', 1, type=int)
+    per_page = 12
+    likes = Like.query.filter_by(user_id=current_user.id).options(joinedload(Like.media)).order_by(
+        Like.created_at.desc(), Like.id.desc()
+    ).paginate(page=page, per_page=per_page, error_out=False)
+    items_page = [
+        {'type': like.media.kind, 'item': like.media, 'liked_at': like.created_at}
+        for like in likes.items
+    ]
+    total_pages = likes.pages or 1
+
+    return render_template('favorites.html',
+                        items=items_page,
+                        page=page,
+                        total_pages=total_pages)
+
+
+@bp.route('/my-uploads')
+@login_required
+def my_uploads():
+    """User's uploaded content"""
+    page = request.args.get('page', 1, type=int)
+    per_page = 12
+    uploads = MediaItem.query.filter_by(user_id=current_user.id).order_by(
+        MediaItem.created_at.desc(), MediaItem.id.desc()
+    ).paginate(page=page, per_page=per_page, error_out=False)
+    items_page = [
+        {'type': item.kind, 'item': item, 'created_at': item.created_at}
+        for item in uploads.items
+    ]
+    total_pages = uploads.pages or 1
+    counts = media_counts(current_user.id)
+
+    return render_template('user/uploads.html',
+                        items=items_page,
+                        page=page,
+                        total_pages=total_pages,
+                        photo_count=counts["photo"],
+                        video_count=counts["video"])
+
+
+@bp.route('/my-albums')
+@login_required
+def my_albums():
+    """User's albums page"""
+    page = request.args.get('page', 1, type=int)
+    per_page = 12
+    user_albums = Album.query.filter_by(user_id=current_user.id).order_by(Album.created_at.desc()).all()
+    total_items = len(user_albums)
+    total_pages = ceil(total_items / per_page) if total_items > 0 else 1
+    start = (page - 1) * per_page
+    end = start + per_page
+    albums_page = user_albums[start:end]
+
+    return render_template('user/my_albums.html',
+                        albums=albums_page,
+                        page=page,
+                        total_pages=total_pages,
+                        total_albums=total_items)
+
+
+@bp.route("/dashboard")
+@login_required
+def dashboard():
+    if current_user.is_admin():
+        return redirect(url_for('admin.admin_dashboard'))
+    else:
+        return redirect(url_for('gallery.user_dashboard'))
+
+
+@bp.route("/dashboard/user")
+@login_required
+def user_dashboard():
+    # The dashboard only shows totals; they come from the precomputed stats row
+    stats = get_stats(current_user.id)
+    return render_template("user/dashboard.html",
+                        album_count=stats.album_count,
+                        photo_count=stats.photo_count,
+                        video_count=stats.video_count)
@@ -0,0 +1,367 @@
+from flask import Blueprint, render_template, redirect, url_for, flash, request, abort, jsonify
+from flask_login import login_required, current_user
+from sqlalchemy import tuple_
+from models import db, Album, MediaItem, Photo, Tag, Like, Comment, Video
+from forms import PhotoUploadForm, VideoUploadForm
+from utils import (
+    allowed_file, save_image, save_video, parse_tags, delete_image, delete_video, content_hash, stored_sizes,
+)
+from likes import toggle_like, like_count
+from comments import comment_page, comment_count, serialize_comment
+from activity import media_uploaded, media_deleted, like_toggled
+from sharing import album_visible, can_view
+from similar import hash_values, similar_photos
+import rollups
+import trending
+
+bp = Blueprint("media", __name__)
+
+
+def neighbours(item):
+    """The items just newer and just older than item in the global feed."""
+    key = tuple_(MediaItem.created_at, MediaItem.id)
+    current = (item.created_at, item.id)
+    feed = MediaItem.query.join(Album, MediaItem.album_id == Album.id).filter(album_visible(current_user))
+    prev_item = feed.filter(key > current).order_by(
+        MediaItem.created_at.asc(), MediaItem.id.asc()
+    ).first()
+    next_item = feed.filter(key < current).order_by(
+        MediaItem.created_at.desc(), MediaItem.id.desc()
+    ).first()
+    return prev_item, next_item
+
+
+def visible_item(model, item_id):
+    """The photo or video with item_id, or None if it is missing or its album is hidden from current_user."""
+    item = db.session.get(model, item_id)
+    if item is None or not can_view(item.album, current_user):
+        return None
+    return item
+
+
+@bp.route("/photos/upload", methods=["GET", "POST"])
+@login_required
+def photo_upload():
+    from imaging import ImageTooLarge
+
+    form = PhotoUploadForm()
+    form.album.choices = [(a.id, a.title) for a in Album.query.filter_by(user_id=current_user.id).all()]
+    if request.method == "POST" and form.validate_on_submit():
+        file = request.files.get("image")
+        if not file or file.filename == "":
+            flash("Please select an image.", "warning")
+            return render_template("photos/upload.html", form=form)
+        if not allowed_file(file.filename):
+            flash("Unsupported file type.", "danger")
+            return render_template("photos/upload.html", form=form)
+        try:
+            saved_filename, original_name, photo_hash, metadata = save_image(file)
+        except ImageTooLarge:
+            flash("Image dimensions are too large.", "danger")
+            return render_template("photos/upload.html", form=form)
+        photo = Photo(
+            filename=saved_filename,
+            original_name=original_name,
+            caption=form.caption.data,
+            album_id=form.album.data,
+            user_id=current_user.id,
+            content_hash=content_hash(saved_filename),
+            size_bytes=sum(stored_sizes(saved_filename)),
+            **hash_values(photo_hash),
+            **metadata,
+        )
+        db.session.add(photo)
+        db.session.flush()
+        media_uploaded(photo)
+        rollups.media_uploaded(photo)
+        trending.media_uploaded(photo)
+        for tag_text in parse_tags(form.tags.data):
+            tag = Tag.query.filter_by(name=tag_text).first()
+            if not tag:
+                tag = Tag(name=tag_text)
+                db.session.add(tag)
+            photo.tags.append(tag)
+
+        db.session.commit()
+        flash("Photo uploaded.", "success")
+        return redirect(url_for("albums.album_detail", album_id=form.album.data))
+    return render_template("photos/upload.html", form=form)
+
+
+@bp.route("/photos/<int:photo_id>")
+def photo_detail(photo_id):
+    photo = Photo.query.get_or_404(photo_id)
+    if not can_view(photo.album, current_user):
+        abort(404)
+    liked = False
+    if current_user.is_authenticated:
+        liked = Like.query.filter_by(user_id=current_user.id, media_id=photo.id).first() is not None
+    prev_item, next_item = neighbours(photo)
+    comments, next_cursor = comment_page(photo.id)
+
+    return render_template(
+        "photos/detail.html",
+        photo=photo,
+        similar=similar_photos(photo, current_user),
+        liked=liked,
+        like_count=like_count(photo.id),
+        comments=comments,
+        comment_count=comment_count(photo.id),
+        next_cursor=next_cursor,
+        prev_item=prev_item,
+        next_item=next_item,
+    )
+
+
+@bp.post("/photos/<int:photo_id>/like")
+@login_required
+def like_photo(photo_id):
+    if visible_item(Photo, photo_id) is None:
+        abort(404)
+    result = toggle_like(Photo, current_user.id, photo_id)
+    if result is None:
+        abort(404)
+    if result[0]:
+        flash("Photo liked!", "success")
+    else:
+        flash("Photo unliked.", "info")
+    return redirect(url_for("media.photo_detail", photo_id=photo_id))
+
+
+@bp.post("/api/photos/<int:photo_id>/like")
+@login_required
+def api_like_photo(photo_id):
+    if visible_item(Photo, photo_id) is None:
+        return jsonify(error="Photo not found"), 404
+    result = toggle_like(Photo, current_user.id, photo_id)
+    if result is None:
+        return jsonify(error="Photo not found"), 404
+    return jsonify(liked=result[0], count=result[1])
+
+
+@bp.route("/api/photos/<int:photo_id>/comments")
+def api_photo_comments(photo_id):
+    if visible_item(Photo, photo_id) is None:
+        return jsonify(error="Photo not found"), 404
+    try:
+        comments, next_cursor = comment_page(photo_id, request.args.get("cursor"))
+    except ValueError:
+        return jsonify(error="Invalid cursor"), 400
+    return jsonify(
+        comments=[serialize_comment(c) for c in comments],
+        next_cursor=next_cursor,
+    )
+
+
+@bp.post("/photos/<int:photo_id>/comment")
+@login_required
+def comment_photo(photo_id):
+    photo = visible_item(Photo, photo_id)
+    if photo is None:
+        abort(404)
+    body = request.form.get("body", "").strip()
+    if body:
+        c = Comment(body=body, user_id=current_user.id, media_id=photo.id)
+        db.session.add(c)
+        rollups.comment_posted(c)
+        trending.comment_posted(c)
+        db.session.commit()
+    else:
+        flash("Comment cannot be empty.", "warning")
+    return redirect(url_for("media.photo_detail", photo_id=photo.id))
+
+
+@bp.route("/comments/<int:comment_id>/delete", methods=["POST"])
+@login_required
+def delete_comment(comment_id):
+    comment = Comment.query.get_or_404(comment_id)
+
+    if comment.user_id != current_user.id and not current_user.is_admin():
+        abort(403)
+
+    db.session.delete(comment)
+    db.session.flush()
+    rollups.comment_deleted(comment)
+    trending.comment_deleted(comment)
+    db.session.commit()
+    flash("Comment deleted.", "success")
+    return redirect(request.referrer or url_for("gallery.index"))
+
+
+@bp.post("/photos/<int:photo_id>/delete")
+@login_required
+def delete_photo(photo_id):
+    photo = Photo.query.get_or_404(photo_id)
+
+    if not (current_user.is_admin() or photo.user_id == current_user.id):
+        abort(403)
+
+    album_id = photo.album_id
+    media_deleted(photo)
+    rollups.media_deleted(photo)
+    delete_image(photo.filename)
+    db.session.delete(photo)
+    db.session.commit()
+
+    flash("Photo deleted successfully.", "success")
+    return redirect(url_for('albums.album_detail', album_id=album_id))
+
+
+@bp.route("/videos/upload", methods=["GET", "POST"])
+@login_required
+def video_upload():
+    form = VideoUploadForm()
+    form.album.choices = [(a.id, a.title) for a in Album.query.filter_by(user_id=current_user.id).all()]
+    if request.method == "POST" and form.validate_on_submit():
+        file = request.files.get("video")
+        if not file or file.filename == "":
+            flash("Please select a video.", "warning")
+            return render_template("videos/upload.html", form=form)
+        if not allowed_file(file.filename):
+            flash("Unsupported file type.", "danger")
+            return render_template("videos/upload.html", form=form)
+
+        saved_filename, original_name = save_video(file)
+        video = Video(
+            filename=saved_filename,
+            original_name=original_name,
+            caption=form.caption.data,
+            album_id=form.album.data,
+            user_id=current_user.id,
+            content_hash=content_hash(saved_filename),
+            size_bytes=sum(stored_sizes(saved_filename)),
+        )
+        db.session.add(video)
+        db.session.flush()
+        media_uploaded(video)
+        rollups.media_uploaded(video)
+        trending.media_uploaded(video)
+        for tag_text in parse_tags(form.tags.data):
+            tag = Tag.query.filter_by(name=tag_text).first()
+            if not tag:
+                tag = Tag(name=tag_text)
+                db.session.add(tag)
+            video.tags.append(tag)
+        db.session.commit()
+        flash("Video uploaded.", "success")
+        return redirect(url_for("albums.album_detail", album_id=form.album.data))
+    return render_template("videos/upload.html", form=form)
+
+
+@bp.route("/videos/<int:video_id>")
+def video_detail(video_id):
+    video = Video.query.get_or_404(video_id)
+    if not can_view(video.album, current_user):
+        abort(404)
+    liked = False
+    if current_user.is_authenticated:
+        liked = Like.query.filter_by(user_id=current_user.id, media_id=video.id).first() is not None
+    prev_item, next_item = neighbours(video)
+    comments, next_cursor = comment_page(video.id)
+
+    return render_template(
+        "videos/detail.html",
+        video=video,
+        liked=liked,
+        like_count=like_count(video.id),
+        comments=comments,
+        comment_count=comment_count(video.id),
+        next_cursor=next_cursor,
+        prev_item=prev_item,
+        next_item=next_item,
+    )
+
+
+@bp.post("/videos/<int:video_id>/like")
+@login_required
+def like_video(video_id):
+    if visible_item(Video, video_id) is None:
+        abort(404)
+    result = toggle_like(Video, current_user.id, video_id)
+    if result is None:
+        abort(404)
+    if result[0]:
+        flash("Video liked!", "success")
+    else:
+        flash("Video unliked.", "info")
+    return redirect(url_for('media.video_detail', video_id=video_id))
+
+
+@bp.post("/api/videos/<int:video_id>/like")
+@login_required
+def api_like_video(video_id):
+    if visible_item(Video, video_id) is None:
+        return jsonify(error="Video not found"), 404
+    result = toggle_like(Video, current_user.id, video_id)
+    if result is None:
+        return jsonify(error="Video not found"), 404
+    return jsonify(liked=result[0], count=result[1])
+
+
+@bp.post("/videos/<int:video_id>/unlike")
+@login_required
+def unlike_video(video_id):
+    video = visible_item(Video, video_id)
+    if video is None:
+        abort(404)
+    like = Like.query.filter_by(user_id=current_user.id, media_id=video.id).first()
+    if like:
+        db.session.delete(like)
+        like_toggled(current_user.id, video.id, False)
+        rollups.like_toggled(current_user.id, video.id, False)
+        trending.like_toggled(video.id, False, like.created_at)
+        db.session.commit()
+        flash("Video unliked.", "info")
+    else:
+        flash("You haven't liked this video.", "warning")
+    return redirect(url_for('media.video_detail', video_id=video.id))
+
+
+@bp.route("/api/videos/<int:video_id>/comments")
+def api_video_comments(video_id):
+    if visible_item(Video, video_id) is None:
+        return jsonify(error="Video not found"), 404
+    try:
+        comments, next_cursor = comment_page(video_id, request.args.get("cursor"))
+    except ValueError:
+        return jsonify(error="Invalid cursor"), 400
+    return jsonify(
+        comments=[serialize_comment(c) for c in comments],
+        next_cursor=next_cursor,
+    )
+
+
+@bp.post("/videos/<int:video_id>/comment")
+@login_required
+def comment_video(video_id):
+    video = visible_item(Video, video_id)
+    if video is None:
+        abort(404)
+    body = request.form.get("body", "").strip()
+    if body:
+        c = Comment(body=body, user_id=current_user.id, media_id=video.id)
+        db.session.add(c)
+        rollups.comment_posted(c)
+        trending.comment_posted(c)
+        db.session.commit()
+    else:
+        flash("Comment cannot be empty.", "warning")
+    return redirect(url_for('media.video_detail', video_id=video.id))
+
+
+@bp.post("/videos/<int:video_id>/delete")
+@login_required
+def delete_video_route(video_id):
+    video = Video.query.get_or_404(video_id)
+
+    if not (current_user.is_admin() or video.user_id == current_user.id):
+        abort(403)
+
+    album_id = video.album_id
+    media_deleted(video)
+    rollups.media_deleted(video)
+    delete_video(video.filename)
+    db.session.delete(video)
+    db.session.commit()
+    flash("Video deleted successfully.", "success")
+    return redirect(url_for('albums.album_detail', album_id=album_id))
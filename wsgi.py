@@ -0,0 +1,4 @@
+"""WSGI entry point: gunicorn wsgi:app, or point a hosting provider's WSGI file here."""
+from app import create_app
+
+app = create_app()
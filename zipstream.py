@@ -0,0 +1,193 @@
+import os
+import struct
+import zlib
+from collections import namedtuple
+
+# Archives are written with no compression: photos and videos are already
+# compressed, and stored members have sizes known before any byte is read.
+# That makes the whole archive's layout, and so its length and the offset
+# of every byte, computable up front, which is what lets Range requests
+# resume a download. CRCs are only known once a file has been read, so they
+# go in a data descriptor after each member and in the central directory.
+CHUNK_SIZE = 64 * 1024
+ZIP64_LIMIT = 0xFFFFFFFF
+FLAG_DATA_DESCRIPTOR = 0x0008
+FLAG_UTF8 = 0x0800
+VERSION_ZIP64 = 45
+VERSION_STORED = 20
+
+ZipEntry = namedtuple("ZipEntry", "name path size mtime")
+
+
+def _dos_time(dt):
+    if dt.year < 1980:
+        return 0, (1 << 5) | 1
+    return (
+        (dt.hour << 11) | (dt.minute << 5) | (dt.second // 2),
+        ((dt.year - 1980) << 9) | (dt.month << 5) | dt.day,
+    )
+
+
+class ZipStream:
+    """
+    A stored ZIP archive of files on disk, generated in CHUNK_SIZE pieces.
+    len() is the exact archive size and iter_range() yields any byte range
+    of it, reading only the files it needs. Sizes must not change between
+    building the stream and reading it.
+    """
+
+    def __init__(self, entries):
+        self.entries = list(entries)
+        self._crcs = {}
+        self._parts = []  # (kind, index, length) in archive order
+        self._offsets = []
+        offset = 0
+        for i, entry in enumerate(self.entries):
+            self._offsets.append(offset)
+            for kind, length in (
+                ("local", len(self._local_header(i))),
+                ("data", entry.size),
+                ("descriptor", 24 if self._zip64(i) else 16),
+            ):
+                self._parts.append((kind, i, length))
+                offset += length
+        self._central_offset = offset
+        self._central_size = sum(len(self._central_header(i, 0)) for i in range(len(self.entries)))
+        self._parts.append(("central", None, self._central_size))
+        self._parts.append(("end", None, len(self._end_records())))
+        self.size = sum(length for _, _, length in self._parts)
+
+    def __len__(self):
+        return self.size
+
+    def _zip64(self, i):
+        return self.entries[i].size >= ZIP64_LIMIT or self._offsets[i] >= ZIP64_LIMIT
+
+    def _name(self, i):
+        return self.entries[i].name.encode("utf-8")
+
+    def _local_header(self, i):
+        entry, name = self.entries[i], self._name(i)
+        time, date = _dos_time(entry.mtime)
+        if self._zip64(i):
+            extra = struct.pack("<HHQQ", 0x0001, 16, entry.size, entry.size)
+            version, size = VERSION_ZIP64, ZIP64_LIMIT
+        else:
+            extra, version, size = b"", VERSION_STORED, entry.size
+        # Sizes are filled in even with the descriptor flag set, so readers
+        # that stream stored members can find where each one ends
+        return struct.pack(
+            "<IHHHHHIIIHH", 0x04034B50, version, FLAG_DATA_DESCRIPTOR | FLAG_UTF8, 0,
+            time, date, 0, size, size, len(name), len(extra),
+        ) + name + extra
+
+    def _descriptor(self, i):
+        size = self.entries[i].size
+        if self._zip64(i):
+            return struct.pack("<IIQQ", 0x08074B50, self._crc(i), size, size)
+        return struct.pack("<IIII", 0x08074B50, self._crc(i), size, size)
+
+    def _central_header(self, i, crc):
+        entry, name = self.entries[i], self._name(i)
+        time, date = _dos_time(entry.mtime)
+        offset = self._offsets[i]
+        if self._zip64(i):
+            extra = struct.pack("<HHQQQ", 0x0001, 24, entry.size, entry.size, offset)
+            version, size, offset = VERSION_ZIP64, ZIP64_LIMIT, ZIP64_LIMIT
+        else:
+            extra, version, size = b"", VERSION_STORED, entry.size
+        return struct.pack(
+            "<IHHHHHHIIIHHHHHII", 0x02014B50, version, version, FLAG_DATA_DESCRIPTOR | FLAG_UTF8, 0,
+            time, date, crc, size, size, len(name), len(extra), 0, 0, 0, 0, offset,
+        ) + name + extra
+
+    def _end_records(self):
+        count, size, offset = len(self.entries), self._central_size, self._central_offset
+        records = b""
+        if count >= 0xFFFF or offset >= ZIP64_LIMIT or size >= ZIP64_LIMIT:
+            end64_offset = offset + size
+            records += struct.pack(
+                "<IQHHIIQQQQ", 0x06064B50, 44, VERSION_ZIP64, VERSION_ZIP64, 0, 0, count, count, size, offset,
+            )
+            records += struct.pack("<IIQI", 0x07064B50, 0, end64_offset, 1)
+            count, size, offset = min(count, 0xFFFF), min(size, ZIP64_LIMIT), min(offset, ZIP64_LIMIT)
+        return records + struct.pack("<IHHHHIIH", 0x06054B50, 0, 0, count, count, size, offset, 0)
+
+    def _crc(self, i):
+        """The member's CRC-32, reading the whole file if it was not streamed in full."""
+        if i not in self._crcs:
+            crc = 0
+            for chunk in self._read(i, 0, self.entries[i].size):
+                crc = zlib.crc32(chunk, crc)
+            self._crcs[i] = crc
+        return self._crcs[i]
+
+    def _read(self, i, start, stop):
+        entry = self.entries[i]
+        with open(entry.path, "rb") as f:
+            f.seek(start)
+            remaining = stop - start
+            while remaining:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise OSError(f"{entry.path} is shorter than {entry.size} bytes")
+                remaining -= len(chunk)
+                yield chunk
+
+    def _part(self, kind, i, start, stop):
+        if kind == "data":
+            if start == 0 and stop == self.entries[i].size:
+                crc = 0
+                for chunk in self._read(i, start, stop):
+                    crc = zlib.crc32(chunk, crc)
+                    yield chunk
+                self._crcs[i] = crc
+            else:
+                yield from self._read(i, start, stop)
+            return
+        if kind == "local":
+            data = self._local_header(i)
+        elif kind == "descriptor":
+            data = self._descriptor(i)
+        elif kind == "central":
+            data = b"".join(self._central_header(n, self._crc(n)) for n in range(len(self.entries)))
+        else:
+            data = self._end_records()
+        yield data[start:stop]
+
+    def iter_range(self, start=0, stop=None):
+        """Yields bytes [start, stop) of the archive."""
+        stop = self.size if stop is None else stop
+        position = 0
+        for kind, i, length in self._parts:
+            end = position + length
+            if end > start and position < stop:
+                yield from self._part(kind, i, max(start - position, 0), min(stop, end) - position)
+            position = end
+            if position >= stop:
+                return
+
+    def __iter__(self):
+        return self.iter_range()
+
+
+def album_entries(items, upload_folder):
+    """ZipEntry for each item whose file exists, named after its original upload name."""
+    entries, seen = [], set()
+    for item in items:
+        path = os.path.join(upload_folder, item.filename)
+        try:
+            size = os.stat(path).st_size
+        except OSError:
+            continue
+        name = item.original_name or item.filename
+        base, dot, ext = name.rpartition(".")
+        if not dot:
+            base, ext = name, ""
+        n = 1
+        while name.lower() in seen:
+            n += 1
+            name = f"{base} ({n}){dot}{ext}"
+        seen.add(name.lower())
+        entries.append(ZipEntry(name, path, size, item.created_at))
+    return entries